@@ -0,0 +1,122 @@
+import cv2
+import numpy as np
+import config
+import metrics
+from face_analysis import detect_face, face_meshes, infer_frame, score_points, timed
+
+INFERENCES_SKIPPED = metrics.counter('inference_skipped_total', 'Frames that reused the previous landmarks')
+ROI_INFERENCES = metrics.counter('inference_roi_total', 'Face Mesh runs on a face crop instead of the full frame')
+
+# Size of the grayscale thumbnail used to measure motion
+MOTION_SIZE = (80, 60)
+
+class FullFrameTracker:
+    """Runs Face Mesh on every full frame
+
+    After each infer(), ran_inference tells whether Face Mesh actually ran on that frame.
+    """
+
+    def __init__(self, face_mesh):
+        self.face_mesh = face_mesh
+        self.ran_inference = False
+
+    def infer(self, frame, timings=None):
+        """Returns (points, metrics) or (None, None)"""
+        self.ran_inference = True
+        return infer_frame(self.face_mesh, frame, timings)
+
+    def close(self):
+        face_meshes.release(self.face_mesh)
+
+class AdaptiveTracker(FullFrameTracker):
+    """Runs Face Mesh only when the image changes, on a crop around the face when possible
+
+    Frames whose thumbnail differs from the last inferred one by less than
+    ADAPTIVE_MOTION_THRESHOLD reuse its landmarks, but never for longer than the
+    ADAPTIVE_MIN_INFERENCE_FPS quality floor allows. While the face stays inside a padded
+    region of interest, a second Face Mesh graph only sees that crop; the region is kept
+    fixed until the face nears its border so that graph's own tracking stays valid.
+    """
+
+    def __init__(self, face_mesh, roi_face_mesh):
+        super().__init__(face_mesh)
+        self.roi_face_mesh = roi_face_mesh
+        self.max_skip = max(0, int(config.CAMERA_FPS / config.ADAPTIVE_MIN_INFERENCE_FPS) - 1)
+        self._thumbnail = None
+        self._points = None
+        self._roi = None
+        self._skipped = 0
+
+    def infer(self, frame, timings=None):
+        with timed(timings, 'motion'):
+            thumbnail = cv2.cvtColor(cv2.resize(frame, MOTION_SIZE, interpolation=cv2.INTER_AREA),
+                                     cv2.COLOR_BGR2GRAY)
+            still = (self._thumbnail is not None
+                     and cv2.absdiff(thumbnail, self._thumbnail).mean() / 255.0 < config.ADAPTIVE_MOTION_THRESHOLD)
+
+        self.ran_inference = not (still and self._skipped < self.max_skip)
+        if not self.ran_inference:
+            # Carry the last landmarks forward
+            self._skipped += 1
+            INFERENCES_SKIPPED.inc()
+        else:
+            self._skipped = 0
+            self._thumbnail = thumbnail
+            self._points = self._detect(frame, timings)
+
+        if self._points is None:
+            return None, None
+        return self._points, score_points(self._points, timings)
+
+    def _detect(self, frame, timings):
+        """Full-frame landmarks as an (N, 3) array, or None"""
+        height, width = frame.shape[:2]
+        if self._roi is not None:
+            x0, y0, x1, y1 = self._roi
+            points = detect_face(self.roi_face_mesh, frame[y0:y1, x0:x1], timings)
+            if points is not None:
+                ROI_INFERENCES.inc()
+                # Map crop-normalized coordinates back onto the full frame
+                crop_width, crop_height = x1 - x0, y1 - y0
+                points[:, 0] = (points[:, 0] * crop_width + x0) / width
+                points[:, 1] = (points[:, 1] * crop_height + y0) / height
+                points[:, 2] *= crop_width / width
+                self._update_roi(points, width, height)
+                return points
+            # Lost the face inside the crop; retry on the full frame
+            self._roi = None
+
+        points = detect_face(self.face_mesh, frame, timings)
+        if points is None:
+            return None
+        self._update_roi(points, width, height)
+        return points
+
+    def _update_roi(self, points, width, height):
+        """Re-centre the crop once the face box leaves the inner part of the current one"""
+        x0, y0 = points[:, 0].min() * width, points[:, 1].min() * height
+        x1, y1 = points[:, 0].max() * width, points[:, 1].max() * height
+        pad_x = (x1 - x0) * config.ADAPTIVE_ROI_PADDING
+        pad_y = (y1 - y0) * config.ADAPTIVE_ROI_PADDING
+
+        if self._roi is not None:
+            rx0, ry0, rx1, ry1 = self._roi
+            if (x0 - rx0 > pad_x / 2 and rx1 - x1 > pad_x / 2
+                    and y0 - ry0 > pad_y / 2 and ry1 - y1 > pad_y / 2):
+                return
+
+        roi = (max(0, int(x0 - pad_x)), max(0, int(y0 - pad_y)),
+               min(width, int(np.ceil(x1 + pad_x))), min(height, int(np.ceil(y1 + pad_y))))
+        # A crop covering most of the frame saves nothing
+        area = (roi[2] - roi[0]) * (roi[3] - roi[1])
+        self._roi = roi if 0 < area < 0.8 * width * height else None
+
+    def close(self):
+        super().close()
+        face_meshes.release(self.roi_face_mesh)
+
+def create_tracker():
+    """Face Mesh wrapped in the tracker selected by INFERENCE_MODE"""
+    if config.INFERENCE_MODE == 'adaptive':
+        return AdaptiveTracker(face_meshes.acquire(), face_meshes.acquire())
+    return FullFrameTracker(face_meshes.acquire())
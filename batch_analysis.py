@@ -0,0 +1,268 @@
+"""Offline scoring of recorded interview videos
+
+    python batch_analysis.py recordings/ --output-dir scores --format columns --workers 8
+
+Each video is split into frame ranges that are scored in a process pool, one FaceMesh
+per worker process. Results are streamed to disk in frame order as they complete, so
+memory stays flat regardless of video length. Outputs mirror each video's path relative
+to the directory it was found in, so videos with the same file name do not collide.
+"""
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import cv2
+import numpy as np
+import config
+from face_analysis import create_face_mesh, detect_face
+from features import extract_features, REFINED_LANDMARK_COUNT, HEAD_POSITIONS, PUPIL_POSITIONS
+from feedback import generate_feedback
+from scoring import score_batch
+
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+
+# Output columns and their on-disk dtype in the columnar format
+COLUMNS = [
+    ('frame', np.int32),
+    ('timestamp', np.float32),
+    ('face_found', np.bool_),
+    ('is_eye_contact', np.bool_),
+    ('confidence', np.float32),
+    ('left_ear', np.float32),
+    ('right_ear', np.float32),
+    ('head_position', np.int8),
+    ('left_pupil', np.int8),
+    ('right_pupil', np.int8)
+]
+
+_face_mesh = None
+
+def _init_worker():
+    """Process pool initializer: one FaceMesh graph per worker process"""
+    global _face_mesh
+    _face_mesh = create_face_mesh()
+
+def score_range(path, start, stop):
+    """Score frames [start, stop) of a video; returns a dict of column arrays"""
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start)
+
+    points = np.zeros((stop - start, REFINED_LANDMARK_COUNT, 3), dtype=np.float32)
+    face_found = np.zeros(stop - start, dtype=np.bool_)
+    count = 0
+    while start + count < stop:
+        success, frame = capture.read()
+        if not success:
+            break
+        face = detect_face(_face_mesh, frame)
+        if face is not None:
+            points[count] = face
+            face_found[count] = True
+        count += 1
+    capture.release()
+
+    points = points[:count]
+    face_found = face_found[:count]
+    features = extract_features(points, jitter=0)
+    is_eye_contact = features['is_eye_contact']
+    if config.SCORING_MODE == 'model' and count:
+        model_decisions = score_batch(features)
+        if model_decisions is not None:
+            is_eye_contact = model_decisions
+    # Frames without a face keep zeroed landmarks; report them as neutral rather than scored
+    pupils = np.where(face_found[:, None], features['pupil_positions'], 0)
+    frames = np.arange(start, start + count, dtype=np.int32)
+    return {
+        'frame': frames,
+        'timestamp': (frames / fps).astype(np.float32),
+        'face_found': face_found,
+        'is_eye_contact': is_eye_contact & face_found,
+        'confidence': np.where(face_found, features['confidence'], 0.0).astype(np.float32),
+        'left_ear': features['left_ear'],
+        'right_ear': features['right_ear'],
+        'head_position': np.where(face_found, features['head_position'], 0).astype(np.int8),
+        'left_pupil': pupils[:, 0].astype(np.int8),
+        'right_pupil': pupils[:, 1].astype(np.int8)
+    }
+
+class CsvWriter:
+    """Per-frame metrics as one CSV row per frame"""
+
+    def __init__(self, path):
+        self._file = open(path + '.csv', 'w', newline='')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow([name for name, _ in COLUMNS])
+
+    def write(self, columns):
+        labels = {'head_position': HEAD_POSITIONS, 'left_pupil': PUPIL_POSITIONS, 'right_pupil': PUPIL_POSITIONS}
+        rows = zip(*[
+            [labels[name][v] for v in columns[name]] if name in labels else columns[name].tolist()
+            for name, _ in COLUMNS
+        ])
+        self._writer.writerows(rows)
+
+    def close(self):
+        self._file.close()
+
+class ColumnWriter:
+    """Columnar output: one raw little-endian file per column plus a schema.json
+
+    Columns can be appended chunk by chunk and read back with numpy.fromfile/memmap.
+    """
+
+    def __init__(self, path):
+        os.makedirs(path, exist_ok=True)
+        self._path = path
+        self._files = {name: open(os.path.join(path, name + '.bin'), 'wb') for name, _ in COLUMNS}
+        self._rows = 0
+
+    def write(self, columns):
+        for name, dtype in COLUMNS:
+            self._files[name].write(np.ascontiguousarray(columns[name], dtype=np.dtype(dtype).newbyteorder('<')).tobytes())
+        self._rows += len(columns['frame'])
+
+    def close(self):
+        for f in self._files.values():
+            f.close()
+        schema = {
+            'rows': self._rows,
+            'columns': {name: np.dtype(dtype).newbyteorder('<').str for name, dtype in COLUMNS}
+        }
+        with open(os.path.join(self._path, 'schema.json'), 'w') as f:
+            json.dump(schema, f, indent=2)
+
+WRITERS = {'csv': CsvWriter, 'columns': ColumnWriter}
+
+class VideoSummary:
+    """Running per-video totals; O(1) memory per video"""
+
+    def __init__(self, path):
+        self.path = path
+        self.frames = 0
+        self.face_frames = 0
+        self.eye_contact_frames = 0
+        self.confidence_sum = 0.0
+
+    def update(self, columns):
+        self.frames += len(columns['frame'])
+        self.face_frames += int(columns['face_found'].sum())
+        self.eye_contact_frames += int(columns['is_eye_contact'].sum())
+        self.confidence_sum += float(columns['confidence'][columns['face_found']].sum())
+
+    def as_dict(self):
+        avg_confidence = self.confidence_sum / self.face_frames if self.face_frames else 0
+        return {
+            'video': self.path,
+            'frames': self.frames,
+            'face_found_ratio': self.face_frames / self.frames if self.frames else 0,
+            'eye_contact_ratio': self.eye_contact_frames / self.face_frames if self.face_frames else 0,
+            'average_confidence': avg_confidence,
+            'feedback': generate_feedback(avg_confidence)
+        }
+
+def find_videos(paths):
+    """Expand directories into the video files they contain
+
+    Yields (video, output name): the video's path relative to the directory given, or its
+    file name if it was given directly, without the extension.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                # Walk subdirectories in a stable order, which fixes summary order and name suffixes
+                dirs.sort()
+                for name in sorted(files):
+                    if name.lower().endswith(VIDEO_EXTENSIONS):
+                        video = os.path.join(root, name)
+                        yield video, os.path.splitext(os.path.relpath(video, path))[0]
+        else:
+            yield path, os.path.splitext(os.path.basename(path))[0]
+
+def plan_chunks(videos, chunk_frames):
+    """Yield (video, output name, start, stop) frame ranges covering every video"""
+    for video, name in videos:
+        capture = cv2.VideoCapture(video)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        capture.release()
+        if total <= 0:
+            print(f"Error: Could not read frame count of {video}")
+            continue
+        for start in range(0, total, chunk_frames):
+            yield video, name, start, min(start + chunk_frames, total)
+
+class VideoOutputs:
+    """Routes scored chunks, which arrive in frame order, to one writer and summary per video"""
+
+    def __init__(self, output_dir, writer_class):
+        self.output_dir = output_dir
+        self.writer_class = writer_class
+        self.summaries = []
+        self._writer = None
+        self._summary = None
+        self._output = None
+        # Output names taken so far; a repeat (the same path under two input directories) gets a suffix
+        self._names = set()
+
+    def write(self, video, name, columns):
+        if self._summary is None or self._summary.path != video:
+            self.close()
+            unique, suffix = name, 1
+            while unique in self._names:
+                suffix += 1
+                unique = f'{name}-{suffix}'
+            self._names.add(unique)
+            output = os.path.join(self.output_dir, unique)
+            os.makedirs(os.path.dirname(output), exist_ok=True)
+            self._writer = self.writer_class(output)
+            self._summary = VideoSummary(video)
+            self._output = unique
+        self._writer.write(columns)
+        self._summary.update(columns)
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self.summaries.append(dict(self._summary.as_dict(), output=self._output))
+            self._writer = self._summary = None
+
+def analyze_videos(paths, output_dir, output_format='csv', workers=None, chunk_frames=300):
+    """Score every video under paths and return the per-video summaries"""
+    os.makedirs(output_dir, exist_ok=True)
+    workers = workers or os.cpu_count()
+    outputs = VideoOutputs(output_dir, WRITERS[output_format])
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded window of chunks in flight and consume them in submission order
+        pending = deque()
+        for video, name, start, stop in plan_chunks(find_videos(paths), chunk_frames):
+            pending.append((video, name, pool.submit(score_range, video, start, stop)))
+            if len(pending) >= workers * 2:
+                video, name, future = pending.popleft()
+                outputs.write(video, name, future.result())
+        while pending:
+            video, name, future = pending.popleft()
+            outputs.write(video, name, future.result())
+
+    outputs.close()
+    return outputs.summaries
+
+def main():
+    parser = argparse.ArgumentParser(description='Score recorded interview videos offline')
+    parser.add_argument('paths', nargs='+', help='video files or directories of videos')
+    parser.add_argument('--output-dir', default='analysis_output')
+    parser.add_argument('--format', choices=sorted(WRITERS), default='csv')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (default: all cores)')
+    parser.add_argument('--chunk-frames', type=int, default=300, help='frames scored per task')
+    args = parser.parse_args()
+
+    summaries = analyze_videos(args.paths, args.output_dir, args.format, args.workers, args.chunk_frames)
+    with open(os.path.join(args.output_dir, 'summary.json'), 'w') as f:
+        json.dump(summaries, f, indent=2)
+    for summary in summaries:
+        print(f"{summary['video']}: {summary['average_confidence']:.1f}% ({summary['feedback']['level']})")
+
+if __name__ == '__main__':
+    main()
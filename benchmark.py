@@ -0,0 +1,170 @@
+"""Camera-free benchmark of the per-frame hot path
+
+    python benchmark.py --frames 300 --output run.json
+    python benchmark.py --video interview.mp4 --baseline run.json
+
+Frames are replayed through the same face_analysis functions the capture workers use
+and every stage is timed. Without --video a seeded synthetic clip is generated; since it
+contains no real face, synthetic landmark fixtures stand in for undetected faces so the
+feature, drawing and encoding stages are always exercised (disable with --no-fixtures).
+Frames are encoded as the MJPEG stream does, at one tier of STREAM_TIERS (--tier).
+"""
+import argparse
+import json
+import platform
+import resource
+import sys
+import time
+import cv2
+import numpy as np
+import config
+from encoding import TIER_NAMES, encode_tier
+from face_analysis import STAGES, create_face_mesh, detect_face, score_points, annotate_frame, timed
+from features import REFINED_LANDMARK_COUNT
+# Distinct frames kept in memory; longer runs cycle through them
+CLIP_LENGTH = 60
+
+def synthetic_clip(length=CLIP_LENGTH, seed=0):
+    """Seeded frames of a moving head-sized blob over sensor-like noise"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(length):
+        frame = rng.integers(90, 140, size=(config.FRAME_HEIGHT, config.FRAME_WIDTH, 3), dtype=np.uint8)
+        center = (config.FRAME_WIDTH // 2 + int(20 * np.sin(i / 8)), config.FRAME_HEIGHT // 2)
+        cv2.ellipse(frame, center, (110, 140), 0, 0, 360, (150, 170, 200), -1)
+        frames.append(frame)
+    return frames
+
+def recorded_clip(path, length=CLIP_LENGTH):
+    """First frames of a recorded video"""
+    capture = cv2.VideoCapture(path)
+    frames = []
+    while len(frames) < length:
+        success, frame = capture.read()
+        if not success:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        raise SystemExit(f"Error: Could not read frames from {path}")
+    return frames
+
+def synthetic_landmarks(length=CLIP_LENGTH, seed=0):
+    """Seeded landmark fixtures: a face-sized point cloud that drifts slightly per frame"""
+    rng = np.random.default_rng(seed)
+    base = np.empty((REFINED_LANDMARK_COUNT, 3), dtype=np.float32)
+    base[:, 0] = rng.uniform(0.35, 0.65, REFINED_LANDMARK_COUNT)
+    base[:, 1] = rng.uniform(0.25, 0.75, REFINED_LANDMARK_COUNT)
+    base[:, 2] = rng.normal(0.0, 0.02, REFINED_LANDMARK_COUNT)
+    return [base + rng.normal(0.0, 0.002, base.shape).astype(np.float32) for _ in range(length)]
+
+def percentiles(samples):
+    samples = np.asarray(samples) * 1000.0
+    return {
+        'mean_ms': float(samples.mean()),
+        'p50_ms': float(np.percentile(samples, 50)),
+        'p95_ms': float(np.percentile(samples, 95)),
+        'p99_ms': float(np.percentile(samples, 99))
+    }
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+def run(frames, fixtures, total_frames, warmup, tier=config.STREAM_DEFAULT_TIER):
+    """Replay frames through the hot path; returns the JSON-ready report"""
+    face_mesh = create_face_mesh()
+    stage_samples = {stage: [] for stage in STAGES}
+    latencies = []
+    faces_found = 0
+    elapsed = 0.0
+
+    for i in range(warmup + total_frames):
+        frame = frames[i % len(frames)].copy()
+        timings = {}
+        start = time.perf_counter()
+        points = detect_face(face_mesh, frame, timings)
+        found = points is not None
+        if not found and fixtures:
+            points = fixtures[i % len(fixtures)]
+        metrics = score_points(points, timings) if points is not None else None
+        annotate_frame(frame, points, metrics, timings)
+        with timed(timings, 'imencode'):
+            encode_tier(frame, tier)
+        latency = time.perf_counter() - start
+
+        if i < warmup:
+            continue
+        elapsed += latency
+        latencies.append(latency)
+        faces_found += found
+        for stage in STAGES:
+            stage_samples[stage].append(timings.get(stage, 0.0))
+    face_mesh.close()
+
+    return {
+        'frames': total_frames,
+        'faces_found': faces_found,
+        'end_to_end': dict(percentiles(latencies), fps=total_frames / elapsed),
+        'stages': {stage: percentiles(samples) for stage, samples in stage_samples.items()},
+        'peak_rss_mb': peak_rss_mb()
+    }
+
+def find_regressions(report, baseline, tolerance):
+    """Compare p95 latencies and FPS against a previous report"""
+    regressions = []
+    if report['end_to_end']['fps'] < baseline['end_to_end']['fps'] * (1 - tolerance):
+        regressions.append(f"fps {baseline['end_to_end']['fps']:.1f} -> {report['end_to_end']['fps']:.1f}")
+    sections = [('end_to_end', report['end_to_end'], baseline['end_to_end'])]
+    sections += [(stage, report['stages'][stage], baseline['stages'].get(stage)) for stage in STAGES]
+    for name, current, previous in sections:
+        if previous and current['p95_ms'] > previous['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name} p95 {previous['p95_ms']:.2f}ms -> {current['p95_ms']:.2f}ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the frame-processing hot path without a camera')
+    parser.add_argument('--video', help='replay a recorded clip instead of the synthetic one')
+    parser.add_argument('--frames', type=int, default=300, help='measured frames')
+    parser.add_argument('--warmup', type=int, default=30, help='unmeasured frames run first')
+    parser.add_argument('--no-fixtures', action='store_true', help='do not substitute landmarks when no face is found')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--tier', choices=TIER_NAMES, default=config.STREAM_DEFAULT_TIER,
+                        help='stream tier whose width and JPEG quality frames are encoded at')
+    parser.add_argument('--output', help='write the JSON report to this file')
+    parser.add_argument('--baseline', help='previous JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative slowdown vs. the baseline')
+    args = parser.parse_args()
+
+    frames = recorded_clip(args.video) if args.video else synthetic_clip(seed=args.seed)
+    fixtures = None if args.no_fixtures else synthetic_landmarks(seed=args.seed)
+    report = run(frames, fixtures, args.frames, args.warmup, args.tier)
+    report['config'] = {
+        'source': args.video or 'synthetic',
+        'fixtures': fixtures is not None,
+        'seed': args.seed,
+        'warmup': args.warmup,
+        'tier': args.tier,
+        'pipeline_mode': config.PIPELINE_MODE,
+        'python': platform.python_version(),
+        'opencv': cv2.__version__,
+        'machine': platform.machine()
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Bounded-memory confidence statistics of an interview
+
+Every analyzed frame updates the running statistics of the current question and of the
+whole interview in O(1): Welford mean and variance, a time-based EMA, time spent in eye
+contact and a 101-bin histogram of whole confidence points for percentiles, so memory
+does not grow with interview length. Per-frame history lives in the session recording.
+"""
+import math
+import numpy as np
+import config
+
+class RunningStats:
+    """Streaming summary of confidence samples"""
+
+    def __init__(self, ema_seconds=config.CONFIDENCE_EMA_SECONDS):
+        self.ema_seconds = ema_seconds
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.ema = None
+        self.seconds = 0.0
+        self.eye_contact_seconds = 0.0
+        self.eye_contact_frames = 0
+        # Frames per whole confidence point, 0-100
+        self.histogram = np.zeros(101, dtype=np.int64)
+
+    def add(self, confidence, eye_contact, dt):
+        """Add one frame; dt is the time since the previous frame, already capped"""
+        self.count += 1
+        delta = confidence - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (confidence - self.mean)
+
+        if self.ema is None:
+            self.ema = confidence
+        else:
+            self.ema += (1.0 - math.exp(-dt / self.ema_seconds)) * (confidence - self.ema)
+
+        self.seconds += dt
+        if eye_contact:
+            self.eye_contact_seconds += dt
+            self.eye_contact_frames += 1
+        self.histogram[min(100, max(0, int(confidence + 0.5)))] += 1
+
+    @property
+    def variance(self):
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def eye_contact_ratio(self):
+        if self.seconds > 0:
+            return self.eye_contact_seconds / self.seconds
+        return self.eye_contact_frames / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Confidence at percentile q (0-100), to the nearest whole point"""
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100.0 * self.count))
+        return float(np.searchsorted(np.cumsum(self.histogram), rank))
+
+    def summary(self):
+        return {
+            'frames': self.count,
+            'mean': round(self.mean, 1),
+            'std': round(math.sqrt(self.variance), 1),
+            'ema': round(self.ema or 0.0, 1),
+            'p10': self.percentile(10),
+            'median': self.percentile(50),
+            'p90': self.percentile(90),
+            'seconds': round(self.seconds, 1),
+            'eye_contact_seconds': round(self.eye_contact_seconds, 1),
+            'eye_contact_ratio': round(self.eye_contact_ratio, 3)
+        }
+
+class ConfidenceHistory:
+    """Per-question and whole-interview statistics"""
+
+    def __init__(self, max_gap=config.CONFIDENCE_MAX_GAP):
+        self.max_gap = max_gap
+        self.reset()
+
+    def reset(self):
+        self._last_time = None
+        self.question_index = 0
+        self.overall = RunningStats()
+        self.questions = {0: RunningStats()}
+
+    def start_question(self, index):
+        """Attribute subsequent frames to question index"""
+        self.question_index = index
+        self.questions.setdefault(index, RunningStats())
+        # Time between questions is not attributed to either of them
+        self._last_time = None
+
+    @property
+    def current(self):
+        return self.questions[self.question_index]
+
+    def add(self, timestamp, confidence, eye_contact):
+        # Gaps (camera stalls, no face) count for at most max_gap seconds
+        dt = 0.0 if self._last_time is None else min(max(0.0, timestamp - self._last_time), self.max_gap)
+        self._last_time = timestamp
+        self.overall.add(confidence, eye_contact, dt)
+        self.current.add(confidence, eye_contact, dt)
@@ -0,0 +1,136 @@
+"""Runtime configuration, overridable through environment variables"""
+import os
+
+# Camera capture settings
+CAMERA_INDEX = int(os.environ.get('CAMERA_INDEX', 0))
+FRAME_WIDTH = int(os.environ.get('FRAME_WIDTH', 640))
+FRAME_HEIGHT = int(os.environ.get('FRAME_HEIGHT', 480))
+CAMERA_FPS = int(os.environ.get('CAMERA_FPS', 30))
+
+# Seconds a camera worker keeps running after its last viewer disconnects
+CAMERA_IDLE_TIMEOUT = float(os.environ.get('CAMERA_IDLE_TIMEOUT', 5.0))
+
+# 'sequential' runs capture, inference and encoding on one thread per camera;
+# 'pipelined' runs each stage on its own thread joined by drop-oldest queues
+PIPELINE_MODE = os.environ.get('PIPELINE_MODE', 'sequential')
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', 1))
+
+# Interview sessions are keyed by this cookie (or an X-Session-Token header)
+SESSION_COOKIE = os.environ.get('SESSION_COOKIE', 'interview_session')
+MAX_SESSIONS = int(os.environ.get('MAX_SESSIONS', 1000))
+# Seconds of inactivity after which a session is evicted
+SESSION_IDLE_TIMEOUT = float(os.environ.get('SESSION_IDLE_TIMEOUT', 1800))
+
+# 'full' runs Face Mesh on every frame; 'adaptive' skips inference while the image is
+# still and crops to the face once tracking is stable
+INFERENCE_MODE = os.environ.get('INFERENCE_MODE', 'full')
+# Mean absolute pixel change (0-1) since the last inference that forces a new one
+ADAPTIVE_MOTION_THRESHOLD = float(os.environ.get('ADAPTIVE_MOTION_THRESHOLD', 0.02))
+# Quality floor: Face Mesh runs at least this often however still the image is
+ADAPTIVE_MIN_INFERENCE_FPS = float(os.environ.get('ADAPTIVE_MIN_INFERENCE_FPS', 5.0))
+# Margin around the face box, relative to its size, when cropping to the face
+ADAPTIVE_ROI_PADDING = float(os.environ.get('ADAPTIVE_ROI_PADDING', 0.3))
+
+# 'mjpeg' draws the overlay on the server and serves /video_feed; 'landmarks' skips
+# drawing and encoding and serves compact landmark packets on /landmark_feed instead
+STREAM_MODE = os.environ.get('STREAM_MODE', 'mjpeg')
+
+# Upper bound on events per second sent to each /eye-contact-stream subscriber; faster
+# metric updates are coalesced into the next event
+STATUS_STREAM_MAX_RATE = float(os.environ.get('STATUS_STREAM_MAX_RATE', 10.0))
+# Seconds between keep-alive comments on an idle status stream
+STATUS_STREAM_KEEPALIVE = float(os.environ.get('STATUS_STREAM_KEEPALIVE', 15.0))
+
+# Text-to-speech: 'server' speaks questions on the server's speakers and renders the
+# /question-audio copy only if a client fetches it, 'browser' caches audio for the client
+# to play from /question-audio as soon as a question is asked
+TTS_PLAYBACK = os.environ.get('TTS_PLAYBACK', 'server')
+TTS_RATE = int(os.environ.get('TTS_RATE', 150))
+TTS_CACHE_DIR = os.environ.get('TTS_CACHE_DIR', 'tts_cache')
+# Synthesize every question at startup rather than on first use
+TTS_PREWARM = os.environ.get('TTS_PREWARM', '0') == '1'
+# Seconds /question-audio waits for audio that is still being synthesized
+TTS_SYNTHESIS_TIMEOUT = float(os.environ.get('TTS_SYNTHESIS_TIMEOUT', 10.0))
+# Seconds a request waits for the TTS engine to start before answering without audio
+TTS_START_TIMEOUT = float(os.environ.get('TTS_START_TIMEOUT', 5.0))
+
+# Question catalog data file, loaded once per process
+QUESTIONS_FILE = os.environ.get('QUESTIONS_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'questions.json'))
+
+# 'rules' scores eye contact with the hand-tuned thresholds; 'model' uses the bundled
+# classifier and falls back to the rules whenever it is unavailable
+SCORING_MODE = os.environ.get('SCORING_MODE', 'rules')
+SCORING_MODEL_PATH = os.environ.get('SCORING_MODEL_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'eye_contact_model.joblib'))
+SCORING_THRESHOLD = float(os.environ.get('SCORING_THRESHOLD', 0.5))
+# Frames from all sessions are scored together in batches of up to this many frames,
+# waiting at most SCORING_BATCH_WAIT_MS for a batch to fill
+SCORING_BATCH_SIZE = int(os.environ.get('SCORING_BATCH_SIZE', 32))
+SCORING_BATCH_WAIT_MS = float(os.environ.get('SCORING_BATCH_WAIT_MS', 5))
+# Milliseconds a frame waits for its batch before keeping the rule-based result
+SCORING_TIMEOUT_MS = float(os.environ.get('SCORING_TIMEOUT_MS', 50))
+
+# Confidence statistics: the EMA time constant and the longest gap between frames that
+# still counts towards time in eye contact
+CONFIDENCE_EMA_SECONDS = float(os.environ.get('CONFIDENCE_EMA_SECONDS', 2.0))
+CONFIDENCE_MAX_GAP = float(os.environ.get('CONFIDENCE_MAX_GAP', 0.5))
+
+# Session recordings of landmarks and metrics (see recording.py), one file per interview
+RECORDING_ENABLED = os.environ.get('RECORDING_ENABLED', '1') == '1'
+RECORDING_DIR = os.environ.get('RECORDING_DIR', 'recordings')
+# 'e' stores landmarks as float16 (about 0.3 px at 640 px wide), 'f' as float32
+RECORDING_LANDMARK_DTYPE = os.environ.get('RECORDING_LANDMARK_DTYPE', 'e')
+# Records read per chunk when rescoring or replaying
+RECORDING_CHUNK_RECORDS = int(os.environ.get('RECORDING_CHUNK_RECORDS', 1024))
+# Recordings older than this many days are deleted, then the oldest until all of them fit
+# in RECORDING_MAX_TOTAL_MB; 0 disables a limit. Checked every RECORDING_PRUNE_INTERVAL
+# seconds by a background thread started with the first recording
+RECORDING_MAX_AGE_DAYS = float(os.environ.get('RECORDING_MAX_AGE_DAYS', 30))
+RECORDING_MAX_TOTAL_MB = float(os.environ.get('RECORDING_MAX_TOTAL_MB', 2048))
+RECORDING_PRUNE_INTERVAL = float(os.environ.get('RECORDING_PRUNE_INTERVAL', 600))
+
+# Idle Face Mesh graphs kept per process for reuse by restarted camera workers
+FACE_MESH_POOL_SIZE = int(os.environ.get('FACE_MESH_POOL_SIZE', 4))
+# Build Face Mesh graphs, the scoring model and the TTS engine when app.py is imported,
+# running one blank frame through inference, instead of on the first request. Forking
+# servers must import the app in each worker, not preload it in the parent
+WARMUP = os.environ.get('WARMUP', '0') == '1'
+
+# Browser frame uploads (/ingest): largest accepted body and frame width (or height, for
+# portrait frames), concurrent decodes and Face Mesh runs per process and the longest a frame waits behind its session's previous one
+INGEST_MAX_BYTES = int(os.environ.get('INGEST_MAX_BYTES', 1024 * 1024))
+INGEST_MAX_WIDTH = int(os.environ.get('INGEST_MAX_WIDTH', 1280))
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', os.cpu_count() or 1))
+INGEST_MAX_WAIT = float(os.environ.get('INGEST_MAX_WAIT', 1.0))
+# A frame numbered more than this below the session's newest one starts a new upload
+# stream (the client reloaded) instead of being dropped as stale
+INGEST_SEQ_RESET = int(os.environ.get('INGEST_SEQ_RESET', 30))
+
+# 'thread' runs Face Mesh inside the server process; 'process' runs it in a pool of
+# INFERENCE_WORKERS worker processes fed frames through shared memory (see inference_pool.py)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'thread')
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', os.cpu_count() or 1))
+# Shared frame buffers per worker and the longest a frame waits for one
+INFERENCE_SLOTS = int(os.environ.get('INFERENCE_SLOTS', 4))
+INFERENCE_SLOT_WAIT = float(os.environ.get('INFERENCE_SLOT_WAIT', 0.05))
+# Seconds to wait for a worker's result before treating the frame as lost
+INFERENCE_TIMEOUT = float(os.environ.get('INFERENCE_TIMEOUT', 2.0))
+# Longest WARMUP waits for each worker process to start and build its graphs
+INFERENCE_WARMUP_TIMEOUT = float(os.environ.get('INFERENCE_WARMUP_TIMEOUT', 60.0))
+# Session trackers a worker keeps before closing the least recently used
+INFERENCE_TRACKERS_PER_WORKER = int(os.environ.get('INFERENCE_TRACKERS_PER_WORKER', 8))
+# Seconds between checks for crashed workers
+INFERENCE_MONITOR_INTERVAL = float(os.environ.get('INFERENCE_MONITOR_INTERVAL', 1.0))
+
+# MJPEG tiers as name:width:JPEG quality, best first; viewers pick one with ?tier=
+STREAM_TIERS = [
+    (name, int(width), int(quality)) for name, width, quality in
+    (tier.split(':') for tier in os.environ.get('STREAM_TIERS', 'high:640:80,medium:480:65,low:320:50').split(','))
+]
+STREAM_DEFAULT_TIER = os.environ.get('STREAM_DEFAULT_TIER', 'high')
+# A send taking longer than STREAM_BACKLOG_FACTOR frame intervals counts as backed up;
+# after STREAM_DOWNGRADE_AFTER such sends a viewer drops a tier (then halves its frame
+# rate, down to STREAM_MIN_FPS), and after STREAM_UPGRADE_AFTER timely sends it steps back up
+STREAM_BACKLOG_FACTOR = float(os.environ.get('STREAM_BACKLOG_FACTOR', 1.5))
+STREAM_DOWNGRADE_AFTER = int(os.environ.get('STREAM_DOWNGRADE_AFTER', 5))
+STREAM_UPGRADE_AFTER = int(os.environ.get('STREAM_UPGRADE_AFTER', 90))
+STREAM_MIN_FPS = float(os.environ.get('STREAM_MIN_FPS', 2))
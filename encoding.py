@@ -0,0 +1,106 @@
+"""Per-tier JPEG encoding shared across viewers, and per-viewer stream adaptation
+
+Camera workers publish annotated frames rather than JPEGs. Each frame is encoded at
+most once per tier (width and JPEG quality), by the first viewer that asks for that
+tier, so tiers nobody watches are never encoded. A ViewerPacer steps a viewer down
+to smaller tiers and then lower frame rates while its sends back up, and back up once
+it keeps pace again.
+"""
+import threading
+import time
+import cv2
+import config
+import metrics
+
+# Tier name -> (width, JPEG quality), best first
+TIERS = {name: (width, quality) for name, width, quality in config.STREAM_TIERS}
+TIER_NAMES = tuple(TIERS)
+
+IMENCODE_SECONDS = metrics.histogram('frame_stage_seconds', 'Per-frame latency of each pipeline stage', stage='imencode')
+TIER_CHANGES = {
+    direction: metrics.counter('stream_tier_changes_total', 'Viewer tier or frame rate adjustments', direction=direction)
+    for direction in ('down', 'up')
+}
+
+def encode_tier(frame, tier):
+    """JPEG bytes of a BGR frame scaled and compressed for tier, or None if encoding fails"""
+    width, quality = TIERS[tier]
+    start = time.perf_counter()
+    height, frame_width = frame.shape[:2]
+    if width < frame_width:
+        frame = cv2.resize(frame, (width, round(height * width / frame_width)), interpolation=cv2.INTER_AREA)
+    ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, quality])
+    IMENCODE_SECONDS.observe(time.perf_counter() - start)
+    metrics.counter('frames_encoded_total', 'JPEG encodes of published frames', tier=tier).inc()
+    if not ret:
+        print("Error: Could not encode frame")
+        return None
+    return buffer.tobytes()
+
+class TieredFrame:
+    """A published frame whose per-tier JPEGs are encoded on first request and then shared"""
+
+    def __init__(self, frame):
+        self.frame = frame
+        self._encoded = {}
+        # One lock per tier: viewers of a tier wait for a single encode, other tiers proceed
+        self._locks = {tier: threading.Lock() for tier in TIER_NAMES}
+
+    def jpeg(self, tier):
+        with self._locks[tier]:
+            if tier not in self._encoded:
+                self._encoded[tier] = encode_tier(self.frame, tier)
+            return self._encoded[tier]
+
+class ViewerPacer:
+    """Tier and frame rate of one viewer, lowered while its sends back up"""
+
+    def __init__(self, tier=None, fps=None):
+        tier = tier if tier in TIERS else config.STREAM_DEFAULT_TIER
+        self.requested_level = self.level = TIER_NAMES.index(tier)
+        self.max_fps = min(max(fps or config.CAMERA_FPS, config.STREAM_MIN_FPS), config.CAMERA_FPS)
+        self.fps = self.max_fps
+        self.next_send = 0.0
+        self._slow = 0
+        self._fast = 0
+
+    @property
+    def tier(self):
+        return TIER_NAMES[self.level]
+
+    def wait(self):
+        """Sleep until this viewer's frame rate allows the next frame"""
+        delay = self.next_send - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def sent(self, started, seconds):
+        """Record a frame that started sending at started and took seconds to hand off"""
+        budget = 1.0 / self.fps
+        self.next_send = started + budget
+        if seconds > budget * config.STREAM_BACKLOG_FACTOR:
+            self._slow += 1
+            self._fast = 0
+        else:
+            self._fast += 1
+            self._slow = 0
+
+        if self._slow >= config.STREAM_DOWNGRADE_AFTER:
+            # Smaller frames first, then fewer of them
+            self._slow = 0
+            if self.level < len(TIER_NAMES) - 1:
+                self.level += 1
+            elif self.fps > config.STREAM_MIN_FPS:
+                self.fps = max(config.STREAM_MIN_FPS, self.fps / 2)
+            else:
+                return
+            TIER_CHANGES['down'].inc()
+        elif self._fast >= config.STREAM_UPGRADE_AFTER:
+            self._fast = 0
+            if self.fps < self.max_fps:
+                self.fps = min(self.max_fps, self.fps * 2)
+            elif self.level > self.requested_level:
+                self.level -= 1
+            else:
+                return
+            TIER_CHANGES['up'].inc()
@@ -0,0 +1,146 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+import cv2
+import numpy as np
+import config
+from features import extract_features, features_to_metrics, landmarks_to_array
+from overlay import draw_mesh
+from scoring import apply_model
+
+# Timed stages of the per-frame hot path, in execution order
+STAGES = ('cvtColor', 'face_mesh', 'features', 'draw_landmarks', 'put_text', 'imencode')
+
+def create_face_mesh(static_image_mode=False):
+    """Create a Face Mesh graph; the graph is not thread-safe, so each worker owns one
+
+    In static image mode every frame is detected from scratch, so results do not depend
+    on which frames the graph saw before.
+    """
+    # Imported here: mediapipe takes most of a second to import and is only needed for inference
+    from mediapipe.python.solutions.face_mesh import FaceMesh
+    return FaceMesh(
+        static_image_mode=static_image_mode,
+        max_num_faces=1,
+        refine_landmarks=True,
+        min_detection_confidence=0.5,
+        min_tracking_confidence=0.5
+    )
+
+class FaceMeshPool:
+    """Lends Face Mesh graphs to workers and keeps returned ones for reuse
+
+    Graphs are built on demand in the process that uses them. MediaPipe cannot build a
+    graph in a child forked after its parent built one, so nothing here runs at import
+    time; graphs inherited across a fork are dropped rather than reused.
+    """
+
+    def __init__(self, factory=create_face_mesh, max_idle=config.FACE_MESH_POOL_SIZE):
+        self.factory = factory
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+
+    def acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._idle = []
+                self._pid = os.getpid()
+            if self._idle:
+                return self._idle.pop()
+        return self.factory()
+
+    def release(self, face_mesh):
+        with self._lock:
+            if self._pid == os.getpid() and len(self._idle) < self.max_idle:
+                self._idle.append(face_mesh)
+                return
+        face_mesh.close()
+
+    def warm_up(self, count=1):
+        """Build count graphs and run a blank frame through each so first use is fast"""
+        frame = np.zeros((config.FRAME_HEIGHT, config.FRAME_WIDTH, 3), dtype=np.uint8)
+        face_meshes = [self.acquire() for _ in range(count)]
+        try:
+            for face_mesh in face_meshes:
+                detect_face(face_mesh, frame)
+        finally:
+            for face_mesh in face_meshes:
+                self.release(face_mesh)
+
+# Tracking graphs for the camera workers
+face_meshes = FaceMeshPool()
+
+@contextmanager
+def timed(timings, stage):
+    """Add the duration of the with-block to timings[stage] when a timings dict is given"""
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+def detect_face(face_mesh, frame, timings=None):
+    """Run Face Mesh on a BGR frame; returns the first face's (N, 3) landmark array or None"""
+    # Convert to RGB for MediaPipe
+    with timed(timings, 'cvtColor'):
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    with timed(timings, 'face_mesh'):
+        results = face_mesh.process(frame_rgb)
+    
+    if not results.multi_face_landmarks:
+        return None
+    with timed(timings, 'features'):
+        return landmarks_to_array(results.multi_face_landmarks[0])
+
+def score_points(points, timings=None):
+    """Compute the metrics dict from one face's (N, 3) landmark array"""
+    with timed(timings, 'features'):
+        features = extract_features(points)
+        metrics = features_to_metrics(features)
+    if config.SCORING_MODE == 'model':
+        with timed(timings, 'model'):
+            metrics = apply_model(features, metrics)
+    return metrics
+
+def infer_frame(face_mesh, frame, timings=None):
+    """Track the face in a BGR frame; returns (points, metrics) or (None, None)"""
+    points = detect_face(face_mesh, frame, timings)
+    if points is None:
+        return None, None
+    return points, score_points(points, timings)
+
+def annotate_frame(frame, points, metrics, timings=None):
+    """Draw the face mesh and metric overlay onto a BGR frame in place"""
+    if points is None:
+        return
+    
+    # Draw face mesh with color based on eye contact
+    mesh_color = (0, 255, 0) if metrics['is_eye_contact'] else (0, 0, 255)
+    with timed(timings, 'draw_landmarks'):
+        draw_mesh(frame, points, mesh_color)
+    
+    # Add visual feedback
+    with timed(timings, 'put_text'):
+        cv2.putText(frame, f"Confidence: {metrics['confidence']:.1f}%", (10, 30),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, mesh_color, 2)
+        cv2.putText(frame, f"Head: {metrics['head_position'].title()}", (10, 60),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, mesh_color, 2)
+        cv2.putText(frame, f"Left Pupil: {metrics['left_pupil'].title()}", (10, 90),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, mesh_color, 2)
+        cv2.putText(frame, f"Right Pupil: {metrics['right_pupil'].title()}", (10, 120),
+                   cv2.FONT_HERSHEY_SIMPLEX, 1, mesh_color, 2)
+
+def encode_frame(frame, timings=None):
+    """Encode a BGR frame as JPEG bytes, or None if encoding fails"""
+    with timed(timings, 'imencode'):
+        ret, buffer = cv2.imencode('.jpg', frame)
+    if not ret:
+        print("Error: Could not encode frame")
+        return None
+    return buffer.tobytes()
@@ -0,0 +1,124 @@
+import numpy as np
+
+# Face Mesh landmark indices; eye contours are listed in the order the EAR formula pairs them
+EYE_CONTOURS = np.array([
+    [33, 246, 161, 160, 159, 158],   # Left eye
+    [362, 398, 384, 385, 386, 387]   # Right eye
+])
+NOSE_TIP = 4
+NOSE_BASE = 1
+# Iris centres (only present with refine_landmarks) and the eye corners they are measured against
+IRIS_CENTERS = np.array([468, 473])
+EYE_INNER_CORNERS = np.array([33, 362])
+EYE_OUTER_CORNERS = np.array([133, 263])
+REFINED_LANDMARK_COUNT = 478
+
+# Integer codes used in the feature arrays
+HEAD_POSITIONS = ('center', 'up', 'down', 'side')
+PUPIL_POSITIONS = ('center', 'left', 'right')
+# Confidence penalty for each head position code
+HEAD_PENALTIES = np.array([0.0, 30.0, 40.0, 35.0], dtype=np.float32)
+
+_rng = np.random.default_rng()
+
+def landmarks_to_array(face_landmarks):
+    """Convert a MediaPipe landmark list into an (N, 3) float32 array"""
+    landmarks = face_landmarks.landmark
+    points = np.fromiter(
+        (c for p in landmarks for c in (p.x, p.y, p.z)),
+        dtype=np.float32, count=len(landmarks) * 3
+    )
+    return points.reshape(-1, 3)
+
+def _norm(vectors):
+    return np.sqrt(np.sum(vectors * vectors, axis=-1))
+
+def eye_aspect_ratios(points):
+    """EAR of both eyes; (..., N, 3) landmarks -> (..., 2)"""
+    eyes = points[..., EYE_CONTOURS, :2]
+    # Vertical distances
+    v1 = _norm(eyes[..., 1, :] - eyes[..., 5, :])
+    v2 = _norm(eyes[..., 2, :] - eyes[..., 4, :])
+    # Horizontal distance
+    h = _norm(eyes[..., 0, :] - eyes[..., 3, :])
+    return (v1 + v2) / (2.0 * h + 1e-6)  # Small epsilon prevents division by zero
+
+def head_positions(nose_direction):
+    """Head position codes (see HEAD_POSITIONS) from (..., 2) nose vectors"""
+    x_movement = np.abs(nose_direction[..., 0])  # Side movement
+    y_movement = nose_direction[..., 1]          # Up/down movement
+    return np.select(
+        [y_movement > 0.08, y_movement < -0.08, x_movement > 0.12],
+        [1, 2, 3],
+        default=0
+    ).astype(np.int8)
+
+def iris_offsets(points):
+    """Relative iris position between the eye corners for both eyes; (..., N, 3) -> (..., 2)"""
+    if points.shape[-2] < REFINED_LANDMARK_COUNT:
+        # No iris landmarks without refine_landmarks; treat the pupils as centred
+        return np.full(points.shape[:-2] + (2,), 0.5, dtype=np.float32)
+    iris = points[..., IRIS_CENTERS, :2]
+    inner = points[..., EYE_INNER_CORNERS, :2]
+    outer = points[..., EYE_OUTER_CORNERS, :2]
+    return _norm(iris - inner) / (_norm(outer - inner) + 1e-6)
+
+def extract_features(points, jitter=2.0, rng=None):
+    """Compute every per-frame feature from one (N, 3) or a (frames, N, 3) batch of landmarks
+
+    Returns a dict of arrays whose leading shape matches the batch shape (scalars for a
+    single frame). Confidence gets +/- jitter of uniform noise, as the live overlay always
+    has; pass jitter=0 for reproducible offline scoring.
+    """
+    points = np.asarray(points, dtype=np.float32)
+    batch_shape = points.shape[:-2]
+
+    ears = eye_aspect_ratios(points)
+    left_ear = ears[..., 0]
+    right_ear = ears[..., 1]
+    avg_ear = (left_ear + right_ear) / 2
+    ear_diff = np.abs(left_ear - right_ear)
+
+    nose_direction = points[..., NOSE_TIP, :2] - points[..., NOSE_BASE, :2]
+    head = head_positions(nose_direction)
+
+    offsets = iris_offsets(points)
+    pupils = np.select([offsets < 0.3, offsets > 0.7], [1, 2], default=0).astype(np.int8)
+
+    # Eye contact needs open, symmetric eyes and a centred head
+    is_eye_contact = (avg_ear > 0.2) & (avg_ear < 0.35) & (ear_diff < 0.05) & (head == 0)
+
+    confidence = np.full(batch_shape, 100.0, dtype=np.float32)
+    # Dynamic penalties based on eye state: closed, too wide (nervous), slightly closed (tired)
+    confidence -= np.select([avg_ear < 0.2, avg_ear > 0.35, avg_ear < 0.25], [25.0, 20.0, 15.0], default=0.0)
+    # Penalty for asymmetric eye opening (can indicate nervousness)
+    confidence -= np.where(ear_diff > 0.05, 10.0, 0.0)
+    # Head position penalties
+    confidence -= HEAD_PENALTIES[head]
+    # Penalty for pupils looking away
+    confidence -= np.where(np.any(pupils != 0, axis=-1), 10.0, 0.0)
+    if jitter:
+        confidence += (rng or _rng).uniform(-jitter, jitter, size=batch_shape)
+    confidence = np.clip(confidence, 0.0, 100.0)
+
+    return {
+        'left_ear': left_ear,
+        'right_ear': right_ear,
+        'nose_direction': nose_direction,
+        'head_position': head,
+        'iris_offsets': offsets,
+        'pupil_positions': pupils,
+        'is_eye_contact': is_eye_contact,
+        'confidence': confidence
+    }
+
+def features_to_metrics(features, index=()):
+    """Turn the features of one frame (optionally picked from a batch) into the metrics dict"""
+    pupils = features['pupil_positions'][index]
+    return {
+        'is_eye_contact': bool(features['is_eye_contact'][index]),
+        'confidence': float(features['confidence'][index]),
+        'head_position': HEAD_POSITIONS[features['head_position'][index]],
+        'left_pupil': PUPIL_POSITIONS[pupils[0]],
+        'right_pupil': PUPIL_POSITIONS[pupils[1]]
+    }
@@ -0,0 +1,42 @@
+def generate_feedback(avg_confidence):
+    """Generate feedback based on average confidence score"""
+    if avg_confidence >= 80:
+        return {
+            'level': 'Excellent',
+            'message': 'Your interview performance was outstanding! You maintained strong eye contact and confidence throughout.',
+            'suggestions': [
+                'Keep up the great work!',
+                'Your body language and eye contact are very professional.',
+                'You appear very confident and engaging.'
+            ]
+        }
+    elif avg_confidence >= 60:
+        return {
+            'level': 'Good',
+            'message': 'You performed well in the interview, showing good confidence and eye contact.',
+            'suggestions': [
+                'Try to maintain eye contact slightly longer.',
+                'Consider practicing more to increase your confidence further.',
+                'Your overall performance is solid, with room for improvement.'
+            ]
+        }
+    elif avg_confidence >= 40:
+        return {
+            'level': 'Fair',
+            'message': 'Your interview performance was acceptable, but there is room for improvement.',
+            'suggestions': [
+                'Practice maintaining eye contact for longer periods.',
+                'Try to relax more during the interview.',
+                'Consider recording yourself to identify areas for improvement.'
+            ]
+        }
+    else:
+        return {
+            'level': 'Needs Improvement',
+            'message': 'Your interview performance needs significant improvement in terms of confidence and eye contact.',
+            'suggestions': [
+                'Practice maintaining eye contact with a friend or in front of a mirror.',
+                'Work on building your confidence through mock interviews.',
+                'Consider taking a public speaking course to improve your presentation skills.'
+            ]
+        }
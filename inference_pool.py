@@ -0,0 +1,301 @@
+"""Face Mesh inference in a pool of worker processes fed through shared memory
+
+Each worker process owns its Face Mesh graphs and a shared_memory block of
+INFERENCE_SLOTS raw frame buffers. The parent copies a frame into a free slot and
+sends only the slot number and shape, so pixels are never pickled; the worker sends
+back the landmarks and metrics. Sessions are pinned to the least loaded worker on
+first use, which keeps their tracking state in one process, and a worker that dies is
+restarted with its in-flight frames failed.
+"""
+import atexit
+import itertools
+import multiprocessing
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+import cv2
+import numpy as np
+import config
+import metrics
+
+RESTARTS = metrics.counter('inference_worker_restarts_total', 'Inference worker processes restarted after dying')
+POOL_DROPPED = metrics.counter('frames_dropped_total', 'Frames discarded before reaching the next stage',
+                               stage='inference_pool')
+POOL_ERRORS = metrics.counter('inference_pool_errors_total', 'Frames whose inference failed or timed out in a worker')
+
+def _worker_main(shm_name, slot_bytes, jobs, results):
+    """Worker process: run inference jobs on frames in the shared slots"""
+    # Imported here so the parent only pays for them in the workers
+    from adaptive import create_tracker
+    from face_analysis import face_meshes
+    from ingest import analyze_upload_locally, image_face_meshes
+
+    # Spawned workers share the parent's resource tracker, which unlinks the block when the parent exits
+    shm = shared_memory.SharedMemory(name=shm_name)
+    # Tracker of each pinned session, least recently used first
+    trackers = OrderedDict()
+    frame = None
+    try:
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            if job[0] == 'release':
+                tracker = trackers.pop(job[1], None)
+                if tracker is not None:
+                    tracker.close()
+                continue
+            if job[0] == 'warmup':
+                # Build the graphs of one tracker and one upload ahead of the first frame
+                try:
+                    face_meshes.warm_up(2 if config.INFERENCE_MODE == 'adaptive' else 1)
+                    image_face_meshes.warm_up(1)
+                    results.put((job[1], None, {}, None))
+                except Exception as e:
+                    results.put((job[1], None, {}, str(e)))
+                continue
+
+            _, job_id, key, slot, shape, stateless = job
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+            timings = {}
+            ran_inference = True
+            try:
+                if stateless:
+                    points, frame_metrics = analyze_upload_locally(frame, timings)
+                else:
+                    tracker = trackers.get(key)
+                    if tracker is None:
+                        tracker = trackers[key] = create_tracker()
+                        if len(trackers) > config.INFERENCE_TRACKERS_PER_WORKER:
+                            trackers.popitem(last=False)[1].close()
+                    trackers.move_to_end(key)
+                    points, frame_metrics = tracker.infer(frame, timings)
+                    ran_inference = tracker.ran_inference
+                results.put((job_id, (points, frame_metrics, ran_inference), timings, None))
+            except Exception as e:
+                results.put((job_id, None, timings, str(e)))
+            frame = None
+    finally:
+        for tracker in trackers.values():
+            tracker.close()
+        frame = None
+        shm.close()
+
+class WorkerHandle:
+    """Parent-side state of one worker process: its slots, queues and in-flight frames"""
+
+    def __init__(self, index, context, slots, slot_bytes):
+        self.index = index
+        self.context = context
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.free_slots = queue.SimpleQueue()
+        for slot in range(slots):
+            self.free_slots.put(slot)
+        self.lock = threading.Lock()
+        # job id -> (future, slot), slot None for jobs without a frame
+        self.pending = {}
+        self.sessions = set()
+        self.process = None
+        self.start()
+
+    @property
+    def load(self):
+        return len(self.pending) + len(self.sessions)
+
+    def start(self):
+        self.jobs = self.context.Queue()
+        results = self.context.Queue()
+        self.process = self.context.Process(
+            target=_worker_main, args=(self.shm.name, self.slot_bytes, self.jobs, results),
+            name=f'inference-{self.index}', daemon=True
+        )
+        self.process.start()
+        threading.Thread(target=self._collect, args=(self.process, results),
+                         name=f'inference-{self.index}-results', daemon=True).start()
+
+    def submit(self, job_id, key, frame, stateless):
+        """Copy frame into a free slot and queue it; None if every slot stays busy"""
+        try:
+            slot = self.free_slots.get(timeout=config.INFERENCE_SLOT_WAIT)
+        except queue.Empty:
+            return None
+        view = np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+        view[...] = frame
+        future = Future()
+        with self.lock:
+            self.pending[job_id] = (future, slot)
+            self.jobs.put(('infer', job_id, key, slot, frame.shape, stateless))
+        return future
+
+    def warm_up(self, job_id):
+        """Have the worker build its graphs; the future resolves once it has"""
+        future = Future()
+        with self.lock:
+            self.pending[job_id] = (future, None)
+            self.jobs.put(('warmup', job_id))
+        return future
+
+    def release(self, key):
+        self.sessions.discard(key)
+        self.jobs.put(('release', key))
+
+    def _collect(self, process, results):
+        """Resolve futures from one worker process's results until that process is gone"""
+        while process is self.process:
+            try:
+                job_id, result, timings, error = results.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    return
+                continue
+            with self.lock:
+                entry = self.pending.pop(job_id, None)
+            if entry is None:
+                continue
+            future, slot = entry
+            if slot is not None:
+                self.free_slots.put(slot)
+            if error is not None:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result((result, timings))
+
+    def restart(self):
+        """Replace a dead worker process, failing the frames it was holding"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+            self.start()
+        for future, slot in pending.values():
+            if slot is not None:
+                self.free_slots.put(slot)
+            future.set_exception(RuntimeError(f'Inference worker {self.index} died'))
+        RESTARTS.inc()
+
+    def stop(self):
+        self.jobs.put(None)
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.shm.close()
+        self.shm.unlink()
+
+class InferencePool:
+    """Worker processes with session pinning, load-aware assignment and automatic restarts"""
+
+    def __init__(self, size=config.INFERENCE_WORKERS, slots=config.INFERENCE_SLOTS):
+        # Spawned, not forked: MediaPipe cannot build graphs in a child forked after the
+        # parent built one, and forking a threaded server is unsafe anyway
+        context = multiprocessing.get_context('spawn')
+        self.slot_bytes = config.FRAME_WIDTH * config.FRAME_HEIGHT * 3
+        self.workers = [WorkerHandle(index, context, slots, self.slot_bytes) for index in range(size)]
+        self._lock = threading.Lock()
+        self._pins = {}
+        self._job_ids = itertools.count()
+        self._closed = threading.Event()
+        metrics.gauge('inference_pinned_sessions', 'Sessions pinned to inference worker processes',
+                      callback=lambda: len(self._pins))
+        for worker in self.workers:
+            metrics.gauge('inference_worker_inflight', 'Frames queued or being analyzed in a worker process',
+                          callback=lambda worker=worker: len(worker.pending), worker=str(worker.index))
+        threading.Thread(target=self._monitor, name='inference-monitor', daemon=True).start()
+
+    def worker_for(self, key):
+        """The worker a session is pinned to, pinning it to the least loaded one first"""
+        with self._lock:
+            worker = self._pins.get(key)
+            if worker is None:
+                worker = self._pins[key] = min(self.workers, key=lambda w: w.load)
+                worker.sessions.add(key)
+            return worker
+
+    def release(self, key):
+        """Unpin a session and drop its tracking state in the worker"""
+        with self._lock:
+            worker = self._pins.pop(key, None)
+        if worker is not None:
+            worker.release(key)
+
+    def infer(self, key, frame, stateless=False, timings=None):
+        """Analyze a BGR frame in the session's worker; returns (points, metrics) or (None, None)"""
+        return self.infer_tracked(key, frame, stateless, timings)[:2]
+
+    def infer_tracked(self, key, frame, stateless=False, timings=None):
+        """infer() plus whether Face Mesh ran, as opposed to the session's tracker reusing landmarks"""
+        if frame.nbytes > self.slot_bytes:
+            scale = (self.slot_bytes / frame.nbytes) ** 0.5
+            frame = cv2.resize(frame, (int(frame.shape[1] * scale), int(frame.shape[0] * scale)),
+                               interpolation=cv2.INTER_AREA)
+        future = self.worker_for(key).submit(next(self._job_ids), key, frame, stateless)
+        if future is None:
+            POOL_DROPPED.inc()
+            return None, None, False
+        try:
+            result, worker_timings = future.result(config.INFERENCE_TIMEOUT)
+        except Exception as e:
+            POOL_ERRORS.inc()
+            print(f"Error: Inference failed: {e}")
+            return None, None, False
+        if timings is not None:
+            for stage, seconds in worker_timings.items():
+                timings[stage] = timings.get(stage, 0.0) + seconds
+        return result
+
+    def tracker(self, key):
+        return PooledTracker(self, key)
+
+    def warm_up(self, timeout=config.INFERENCE_WARMUP_TIMEOUT):
+        """Block until every worker process has started and built its Face Mesh graphs"""
+        futures = [worker.warm_up(next(self._job_ids)) for worker in self.workers]
+        for worker, future in zip(self.workers, futures):
+            try:
+                future.result(timeout)
+            except Exception as e:
+                print(f"Error: Inference worker {worker.index} failed to warm up: {e}")
+
+    def _monitor(self):
+        while not self._closed.wait(config.INFERENCE_MONITOR_INTERVAL):
+            for worker in self.workers:
+                if not worker.process.is_alive():
+                    print(f"Error: Inference worker {worker.index} exited with code "
+                          f"{worker.process.exitcode}; restarting it")
+                    worker.restart()
+
+    def close(self):
+        self._closed.set()
+        for worker in self.workers:
+            worker.stop()
+
+class PooledTracker:
+    """Tracker interface (see adaptive.py) backed by the session's worker process"""
+
+    def __init__(self, pool, key):
+        self.pool = pool
+        self.key = key
+        self.ran_inference = False
+
+    def infer(self, frame, timings=None):
+        points, frame_metrics, self.ran_inference = self.pool.infer_tracked(self.key, frame, timings=timings)
+        return points, frame_metrics
+
+    def close(self):
+        self.pool.release(self.key)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_inference_pool():
+    """The process-wide pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = InferencePool()
+            atexit.register(_pool.close)
+        return _pool
+
+def release_session(key):
+    """Unpin a session if the pool is running"""
+    if _pool is not None:
+        _pool.release(key)
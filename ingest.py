@@ -0,0 +1,136 @@
+"""Analysis of frames uploaded by the candidate's browser
+
+Each POST to /ingest carries one JPEG frame. Inference is stateless: frames are scored by
+static-image Face Mesh graphs borrowed from a pool, so any thread, process or node behind
+a load balancer can handle any frame. Per session, only the newest frame is worth
+waiting for; an older frame still queued when a newer one arrives is dropped.
+"""
+import functools
+import struct
+import threading
+import time
+import cv2
+import numpy as np
+import config
+import metrics
+from face_analysis import FaceMeshPool, create_face_mesh, detect_face, score_points, timed
+
+INGESTED = metrics.counter('ingest_frames_total', 'Uploaded frames analyzed')
+INGEST_QUEUE_WAIT = metrics.histogram('ingest_wait_seconds', 'Time an uploaded frame waited for its session and a worker')
+STREAM_RESTARTS = metrics.counter('ingest_stream_restarts_total', 'Upload streams whose frame numbering started over')
+
+# Static-image graphs shared by every session, one kept idle per concurrent upload
+image_face_meshes = FaceMeshPool(functools.partial(create_face_mesh, static_image_mode=True),
+                                 max_idle=config.INGEST_WORKERS)
+# Bounds concurrent decoding and inference across all sessions of this process
+_workers = threading.BoundedSemaphore(config.INGEST_WORKERS)
+
+def dropped_counter(reason):
+    return metrics.counter('ingest_dropped_total', 'Uploaded frames not analyzed', reason=reason)
+
+# JPEG start-of-frame markers, which carry the image size; C4, C8 and CC are other segments
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+def image_size(data):
+    """(width, height) declared in a JPEG or PNG header, without decoding; None if not found"""
+    if data.startswith(PNG_SIGNATURE) and data[12:16] == b'IHDR':
+        return struct.unpack('>II', data[16:24])
+    if not data.startswith(b'\xff\xd8'):
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            # Fill byte before a marker
+            i += 1
+        elif marker == 0x01 or 0xD0 <= marker <= 0xD9:
+            i += 2
+        elif marker in SOF_MARKERS:
+            height, width = struct.unpack('>HH', data[i + 5:i + 9])
+            return width, height
+        else:
+            i += 2 + struct.unpack('>H', data[i + 2:i + 4])[0]
+    return None
+
+def decode_frame(data, timings=None, waited=0.0):
+    """Decode JPEG (or PNG) bytes into a BGR frame; None if the data is not an image
+
+    waited is how long the frame already waited for its session; with the wait for a
+    worker slot it is observed in INGEST_QUEUE_WAIT.
+    """
+    start = time.perf_counter()
+    with _workers:
+        INGEST_QUEUE_WAIT.observe(waited + time.perf_counter() - start)
+        with timed(timings, 'decode'):
+            return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+def analyze_upload(frame, timings=None, session_key=None):
+    """Stateless inference on one uploaded frame; returns (points, metrics) or (None, None)"""
+    if config.INFERENCE_BACKEND == 'process':
+        from inference_pool import get_inference_pool
+        return get_inference_pool().infer(session_key, frame, stateless=True, timings=timings)
+    return analyze_upload_locally(frame, timings)
+
+def analyze_upload_locally(frame, timings=None):
+    """analyze_upload on a graph of this process"""
+    with _workers:
+        face_mesh = image_face_meshes.acquire()
+        try:
+            points = detect_face(face_mesh, frame, timings)
+        finally:
+            image_face_meshes.release(face_mesh)
+    if points is None:
+        return None, None
+    return points, score_points(points, timings)
+
+class FrameGate:
+    """Per-session backpressure: one frame in analysis, at most the newest one waiting
+
+    enter() blocks while the session's previous frame is being analyzed and returns
+    False if the frame was superseded by a newer one (or is older than one already
+    analyzed) in the meantime. A new stream id means the client started numbering over
+    (after a page reload, say). Clients that send no stream id get the same treatment
+    for a seq more than INGEST_SEQ_RESET below the newest one; with a stream id, such a
+    frame is just late and is dropped.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._busy = False
+        self._stream = None
+        self._newest = 0
+        self._analyzed = 0
+
+    def enter(self, seq=None, stream=None, timeout=config.INGEST_MAX_WAIT):
+        with self._cond:
+            if seq is None:
+                seq = self._newest + 1
+            restarted = stream is None and seq < self._newest - config.INGEST_SEQ_RESET
+            if stream != self._stream or restarted:
+                if self._newest:
+                    STREAM_RESTARTS.inc()
+                self._stream = stream
+                self._newest = self._analyzed = seq - 1
+            if seq <= self._analyzed or seq <= self._newest:
+                dropped_counter('stale').inc()
+                return False
+            self._newest = seq
+            # Wake any older waiter so it can give up its place
+            self._cond.notify_all()
+            if not self._cond.wait_for(lambda: not self._busy or self._newest != seq, timeout):
+                dropped_counter('timeout').inc()
+                return False
+            if self._newest != seq:
+                dropped_counter('superseded').inc()
+                return False
+            self._busy = True
+            self._analyzed = seq
+            return True
+
+    def leave(self):
+        with self._cond:
+            self._busy = False
+            self._cond.notify_all()
@@ -0,0 +1,170 @@
+"""Lightweight in-process metrics rendered in the Prometheus text format
+
+Every metric guards its state with its own lock and does constant work per update, so the
+instrumentation can stay on in the frame loop. Histograms are cumulative, as Prometheus
+expects; rolling views come from rate() over the scraped series.
+"""
+import bisect
+import threading
+import time
+from collections import deque
+
+# Latency buckets in seconds, fine-grained around the 33 ms frame budget
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.02, 0.033, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+class Counter:
+    """Monotonically increasing count"""
+    type = 'counter'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = 0
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self):
+        yield '', {}, self._value
+
+class Gauge:
+    """Value that can go up and down, or is read from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, callback=None):
+        self._lock = threading.Lock()
+        self._value = 0
+        self._callback = callback
+
+    def set(self, value):
+        self._value = value
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+    def samples(self):
+        yield '', {}, self._callback() if self._callback else self._value
+
+class Histogram:
+    """Cumulative bucketed distribution of observed values"""
+    type = 'histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self._lock = threading.Lock()
+        self._bounds = tuple(buckets)
+        self._counts = [0] * (len(self._bounds) + 1)
+        self._sum = 0.0
+
+    def observe(self, value):
+        index = bisect.bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = 0
+        for bound, count in zip(self._bounds, counts):
+            cumulative += count
+            yield '_bucket', {'le': repr(bound)}, cumulative
+        cumulative += counts[-1]
+        yield '_bucket', {'le': '+Inf'}, cumulative
+        yield '_sum', {}, total
+        yield '_count', {}, cumulative
+
+class RateMeter:
+    """Events per second over a sliding window, exported as a gauge"""
+    type = 'gauge'
+
+    def __init__(self, window=5.0):
+        self._lock = threading.Lock()
+        self._window = window
+        self._events = deque()
+
+    def mark(self):
+        now = time.monotonic()
+        with self._lock:
+            self._events.append(now)
+            self._expire(now)
+
+    def _expire(self, now):
+        while self._events and now - self._events[0] > self._window:
+            self._events.popleft()
+
+    @property
+    def rate(self):
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self._events) / self._window
+
+    def samples(self):
+        yield '', {}, self.rate
+
+class Registry:
+    """Named, optionally labelled metrics; the same name and labels return the same metric"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._help = {}
+
+    def _get(self, cls, name, help, labels, **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            metric = self._metrics.get(key)
+            if metric is None:
+                metric = self._metrics[key] = cls(**kwargs)
+                self._help.setdefault(name, (help, cls.type))
+            return metric
+
+    def counter(self, name, help, **labels):
+        return self._get(Counter, name, help, labels)
+
+    def gauge(self, name, help, callback=None, **labels):
+        return self._get(Gauge, name, help, labels, callback=callback)
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, **labels):
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def rate(self, name, help, window=5.0, **labels):
+        return self._get(RateMeter, name, help, labels, window=window)
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.items())
+        lines = []
+        seen = set()
+        for (name, labels), metric in sorted(metrics, key=lambda item: item[0][0]):
+            if name not in seen:
+                seen.add(name)
+                help, metric_type = self._help[name]
+                lines.append(f'# HELP {name} {help}')
+                lines.append(f'# TYPE {name} {metric_type}')
+            for suffix, extra, value in metric.samples():
+                lines.append(f'{name}{suffix}{_format_labels(dict(labels, **extra))} {value}')
+        return '\n'.join(lines) + '\n'
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+rate = REGISTRY.rate
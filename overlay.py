@@ -0,0 +1,77 @@
+import struct
+import time
+from functools import lru_cache
+import cv2
+import numpy as np
+from features import HEAD_POSITIONS, PUPIL_POSITIONS
+
+@lru_cache(maxsize=None)
+def tesselation_edges():
+    """FACEMESH_TESSELATION as an (E, 2) index array with each edge listed once
+
+    The MediaPipe list has most edges in both directions; deduplicating them lets a whole
+    mesh be drawn with one polylines call. Built on first use so importing this module
+    does not import mediapipe.
+    """
+    from mediapipe.python.solutions.face_mesh_connections import FACEMESH_TESSELATION
+    return np.unique(np.sort(np.array(sorted(FACEMESH_TESSELATION), dtype=np.int32), axis=1), axis=0)
+
+# One-pixel cross around each landmark, like the radius-1 circles draw_landmarks made
+_DOT_OFFSETS = np.array([[0, 0], [1, 0], [-1, 0], [0, 1], [0, -1]], dtype=np.int32)
+
+def to_pixels(points, width, height):
+    """(N, 3) normalized landmarks -> (N, 2) int32 pixel coordinates"""
+    return np.rint(points[:, :2] * (width, height)).astype(np.int32)
+
+def draw_mesh(frame, points, color):
+    """Draw the tessellation and landmark dots of one face onto a BGR frame in place"""
+    height, width = frame.shape[:2]
+    pixels = to_pixels(points, width, height)
+    cv2.polylines(frame, pixels[tesselation_edges()], False, color, 1)
+
+    dots = (pixels[:, None, :] + _DOT_OFFSETS).reshape(-1, 2)
+    inside = (dots[:, 0] >= 0) & (dots[:, 0] < width) & (dots[:, 1] >= 0) & (dots[:, 1] < height)
+    dots = dots[inside]
+    frame[dots[:, 1], dots[:, 0]] = color
+
+# Landmark stream packet: magic, sequence number, capture time, flags (bit 0: face found,
+# bit 1: eye contact), head/left pupil/right pupil codes, confidence and landmark count,
+# followed by count (x, y) pairs quantized to uint16 over the normalized [0, 1] range
+PACKET_MAGIC = b'LMK1'
+PACKET_HEADER = struct.Struct('<4sIdBBBBfH')
+FLAG_FACE_FOUND = 1
+FLAG_EYE_CONTACT = 2
+
+def encode_landmark_packet(seq, points, metrics, timestamp=None):
+    """Pack one frame's landmarks and metrics for clients that draw the mesh themselves"""
+    timestamp = time.time() if timestamp is None else timestamp
+    if points is None:
+        return PACKET_HEADER.pack(PACKET_MAGIC, seq, timestamp, 0, 0, 0, 0, 0.0, 0)
+    flags = FLAG_FACE_FOUND | (FLAG_EYE_CONTACT if metrics['is_eye_contact'] else 0)
+    header = PACKET_HEADER.pack(
+        PACKET_MAGIC, seq, timestamp, flags,
+        HEAD_POSITIONS.index(metrics['head_position']),
+        PUPIL_POSITIONS.index(metrics['left_pupil']),
+        PUPIL_POSITIONS.index(metrics['right_pupil']),
+        metrics['confidence'], len(points)
+    )
+    coords = np.rint(np.clip(points[:, :2], 0.0, 1.0) * 65535).astype('<u2')
+    return header + coords.tobytes()
+
+def decode_landmark_packet(packet):
+    """Inverse of encode_landmark_packet; returns (seq, timestamp, points or None, metrics or None)"""
+    magic, seq, timestamp, flags, head, left, right, confidence, count = PACKET_HEADER.unpack_from(packet)
+    if magic != PACKET_MAGIC:
+        raise ValueError('Not a landmark packet')
+    if not flags & FLAG_FACE_FOUND:
+        return seq, timestamp, None, None
+    coords = np.frombuffer(packet, dtype='<u2', count=count * 2, offset=PACKET_HEADER.size)
+    points = coords.reshape(count, 2).astype(np.float32) / 65535
+    metrics = {
+        'is_eye_contact': bool(flags & FLAG_EYE_CONTACT),
+        'confidence': confidence,
+        'head_position': HEAD_POSITIONS[head],
+        'left_pupil': PUPIL_POSITIONS[left],
+        'right_pupil': PUPIL_POSITIONS[right]
+    }
+    return seq, timestamp, points, metrics
@@ -0,0 +1,368 @@
+import struct
+import threading
+import time
+from collections import deque
+import cv2
+import config
+import metrics
+from adaptive import create_tracker
+from encoding import TieredFrame, ViewerPacer
+from face_analysis import STAGES, annotate_frame, face_meshes, timed
+from overlay import encode_landmark_packet, tesselation_edges
+from scoring import get_batcher
+
+# Hot-path instrumentation exported through /metrics
+STAGE_SECONDS = {
+    stage: metrics.histogram('frame_stage_seconds', 'Per-frame latency of each pipeline stage', stage=stage)
+    for stage in ('capture', 'decode', 'motion') + STAGES + ('model', 'pack_landmarks')
+}
+CAPTURE_FPS = metrics.rate('capture_fps', 'Frames read from cameras per second')
+INFERENCE_FPS = metrics.rate('inference_fps', 'Frames run through face tracking per second')
+STREAM_FPS = metrics.rate('stream_fps', 'Frames delivered to /video_feed viewers per second')
+FRAMES_ANALYZED = metrics.counter('frames_analyzed_total', 'Frames run through face tracking')
+FACES_NOT_FOUND = metrics.counter('faces_not_found_total', 'Analyzed frames in which no face was found')
+ACTIVE_STREAMS = metrics.gauge('active_streams', 'Open /video_feed responses')
+STREAM_SEND_SECONDS = metrics.histogram('stream_send_seconds', 'Time for a viewer to accept one frame')
+STREAM_DROPPED = metrics.counter('frames_dropped_total', 'Frames discarded before reaching the next stage',
+                                 stage='stream')
+
+class FrameHub:
+    """Broadcasts the latest encoded frame and metrics of one camera to any number of viewers"""
+
+    def __init__(self, camera_index):
+        self.camera_index = camera_index
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._frame = None
+        self._metrics = None
+        self._viewers = 0
+        # Session key -> open streams of that session; only these sessions receive metrics
+        self._watchers = {}
+        self._idle_since = time.monotonic()
+        self._running = False
+        # Bumped on every worker start so a stale worker cannot stop its successor
+        self._generation = 0
+        # Held by the worker for as long as it owns the camera device
+        self.camera_lock = threading.Lock()
+
+    @property
+    def metrics(self):
+        """Metrics of the most recent frame in which a face was found"""
+        with self._cond:
+            return self._metrics
+
+    @property
+    def viewers(self):
+        with self._cond:
+            return self._viewers
+
+    def publish(self, frame, metrics=None, points=None):
+        """Replace the current frame, if any, and wake every waiting viewer"""
+        with self._cond:
+            if frame is not None:
+                self._seq += 1
+                self._frame = frame
+            if metrics is not None:
+                self._metrics = metrics
+            watchers = tuple(self._watchers)
+            self._cond.notify_all()
+        if metrics is not None and watchers:
+            for listener in _metrics_listeners:
+                listener(watchers, metrics, points)
+
+    def wait_for_frame(self, last_seq, timeout=1.0):
+        """Block until a frame newer than last_seq is published; returns (seq, frame)"""
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq != last_seq or not self._running, timeout)
+            return self._seq, self._frame
+
+    def ensure_running(self, start_worker):
+        """Start the capture worker unless one is already running"""
+        with self._cond:
+            self._idle_since = time.monotonic()
+            if self._running:
+                return
+            self._running = True
+            self._generation += 1
+            generation = self._generation
+        start_worker(generation)
+
+    def should_stop(self, generation):
+        """Called by the worker; stops it once nobody has watched for CAMERA_IDLE_TIMEOUT"""
+        with self._cond:
+            if generation != self._generation:
+                return True
+            if self._viewers == 0 and time.monotonic() - self._idle_since > config.CAMERA_IDLE_TIMEOUT:
+                self._running = False
+            return not self._running
+
+    def mark_stopped(self, generation):
+        with self._cond:
+            if generation == self._generation:
+                self._running = False
+                self._cond.notify_all()
+
+    def stream(self, format_chunk=None, tier=None, fps=None, watcher=None):
+        """Yield the published payloads; a slow viewer simply skips to the newest one
+
+        JPEG viewers receive the shared encoding of their tier; the tier and frame rate
+        drop while the viewer falls behind (see encoding.ViewerPacer). While the stream is
+        open, the session keyed watcher receives this camera's metrics.
+        """
+        format_chunk = format_chunk or multipart_jpeg_chunk
+        pacer = ViewerPacer(tier, fps)
+        with self._cond:
+            self._viewers += 1
+            if watcher is not None:
+                self._watchers[watcher] = self._watchers.get(watcher, 0) + 1
+        ACTIVE_STREAMS.inc()
+        try:
+            seq = 0
+            while True:
+                pacer.wait()
+                last_seq = seq
+                seq, frame = self.wait_for_frame(seq)
+                if frame is None:
+                    with self._cond:
+                        if not self._running:
+                            break
+                    continue
+                # Frames skipped to honour a reduced frame rate are not drops
+                if last_seq and seq - last_seq > 1 and pacer.fps >= config.CAMERA_FPS:
+                    STREAM_DROPPED.inc(seq - last_seq - 1)
+                payload = frame.jpeg(pacer.tier) if isinstance(frame, TieredFrame) else frame
+                if payload is None:
+                    continue
+                started = time.monotonic()
+                start = time.perf_counter()
+                yield format_chunk(payload)
+                # The generator resumes once the server has handed the chunk to the client
+                send_seconds = time.perf_counter() - start
+                STREAM_SEND_SECONDS.observe(send_seconds)
+                pacer.sent(started, send_seconds)
+                STREAM_FPS.mark()
+                with self._cond:
+                    if not self._running:
+                        break
+        finally:
+            ACTIVE_STREAMS.dec()
+            with self._cond:
+                self._viewers -= 1
+                if watcher is not None:
+                    self._watchers[watcher] -= 1
+                    if not self._watchers[watcher]:
+                        del self._watchers[watcher]
+                if self._viewers == 0:
+                    self._idle_since = time.monotonic()
+
+def multipart_jpeg_chunk(payload):
+    """One part of a multipart/x-mixed-replace JPEG stream"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + payload + b'\r\n')
+
+def length_prefixed_chunk(payload):
+    """A binary packet preceded by its little-endian uint32 length"""
+    return struct.pack('<I', len(payload)) + payload
+
+def open_camera(camera_index):
+    """Open a camera with the configured capture settings"""
+    camera = cv2.VideoCapture(camera_index)
+    camera.set(cv2.CAP_PROP_FRAME_WIDTH, config.FRAME_WIDTH)
+    camera.set(cv2.CAP_PROP_FRAME_HEIGHT, config.FRAME_HEIGHT)
+    camera.set(cv2.CAP_PROP_FPS, config.CAMERA_FPS)
+    return camera
+
+def read_frame(camera):
+    """Read one frame, recording capture latency and FPS"""
+    start = time.perf_counter()
+    success, frame = camera.read()
+    STAGE_SECONDS['capture'].observe(time.perf_counter() - start)
+    if success:
+        CAPTURE_FPS.mark()
+    return success, frame
+
+def record_inference(frame_metrics):
+    """Count a frame Face Mesh ran on; frames that reused the previous landmarks are not counted"""
+    INFERENCE_FPS.mark()
+    FRAMES_ANALYZED.inc()
+    if frame_metrics is None:
+        FACES_NOT_FOUND.inc()
+
+def record_timings(timings):
+    for stage, seconds in timings.items():
+        STAGE_SECONDS[stage].observe(seconds)
+
+def create_worker_tracker(camera_index):
+    """Tracker for a camera worker, in this process or in the inference pool (INFERENCE_BACKEND)"""
+    if config.INFERENCE_BACKEND == 'process':
+        from inference_pool import get_inference_pool
+        return get_inference_pool().tracker(f'camera-{camera_index}')
+    return create_tracker()
+
+class CaptureWorker(threading.Thread):
+    """Single background capture + inference loop feeding one FrameHub"""
+
+    def __init__(self, hub, camera_index, generation):
+        super().__init__(name=f'capture-{camera_index}', daemon=True)
+        self.hub = hub
+        self.camera_index = camera_index
+        self.generation = generation
+        self._seq = 0
+
+    def run(self):
+        with self.hub.camera_lock:
+            camera = open_camera(self.camera_index)
+            try:
+                if not camera.isOpened():
+                    print("Error: Could not open camera")
+                    return
+                tracker = create_worker_tracker(self.camera_index)
+                try:
+                    self.capture_loop(camera, tracker)
+                finally:
+                    tracker.close()
+            finally:
+                camera.release()
+                self.hub.mark_stopped(self.generation)
+
+    def capture_loop(self, camera, tracker):
+        while not self.hub.should_stop(self.generation):
+            success, frame = read_frame(camera)
+            if not success:
+                print("Error: Could not read frame")
+                break
+
+            timings = {}
+            points, frame_metrics = tracker.infer(frame, timings)
+            if tracker.ran_inference:
+                record_inference(frame_metrics)
+            # Nobody watching: keep feeding sessions their metrics but skip drawing and encoding
+            payload = self.render(frame, points, frame_metrics, timings) if self.hub.viewers else None
+            record_timings(timings)
+            self.hub.publish(payload, frame_metrics, points)
+
+    def render(self, frame, points, frame_metrics, timings):
+        """Build what viewers receive: an annotated frame, encoded per tier on demand, or
+        in landmarks mode a packet"""
+        self._seq += 1
+        if config.STREAM_MODE == 'landmarks':
+            with timed(timings, 'pack_landmarks'):
+                return encode_landmark_packet(self._seq, points, frame_metrics)
+        annotate_frame(frame, points, frame_metrics, timings)
+        return TieredFrame(frame)
+
+class LatestQueue:
+    """Bounded queue that drops its oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize=1, name='queue'):
+        self._items = deque(maxlen=maxsize)
+        self._cond = threading.Condition()
+        self.dropped = metrics.counter('frames_dropped_total', 'Frames discarded before reaching the next stage',
+                                       stage=name)
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped.inc()
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Pop the oldest queued item, or None if nothing arrives within timeout"""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._items, timeout):
+                return None
+            return self._items.popleft()
+
+class PipelinedCaptureWorker(CaptureWorker):
+    """Runs capture, inference and annotate/encode on separate threads
+
+    Stages are joined by LatestQueues, so a slow stage only ever works on the newest
+    frame and end-to-end throughput is bounded by the slowest stage, not their sum.
+    """
+
+    def capture_loop(self, camera, tracker):
+        self._stopped = threading.Event()
+        self._inference_queue = LatestQueue(config.PIPELINE_QUEUE_SIZE, 'inference_queue')
+        self._encode_queue = LatestQueue(config.PIPELINE_QUEUE_SIZE, 'encode_queue')
+        stages = [
+            threading.Thread(target=self.inference_loop, args=(tracker,),
+                             name=f'{self.name}-inference', daemon=True),
+            threading.Thread(target=self.encode_loop, name=f'{self.name}-encode', daemon=True)
+        ]
+        for stage in stages:
+            stage.start()
+        try:
+            while not self.hub.should_stop(self.generation):
+                success, frame = read_frame(camera)
+                if not success:
+                    print("Error: Could not read frame")
+                    break
+                self._inference_queue.put(frame)
+        finally:
+            self._stopped.set()
+            for stage in stages:
+                stage.join()
+
+    def inference_loop(self, tracker):
+        while not self._stopped.is_set():
+            frame = self._inference_queue.get(timeout=0.1)
+            if frame is None:
+                continue
+            timings = {}
+            points, frame_metrics = tracker.infer(frame, timings)
+            if tracker.ran_inference:
+                record_inference(frame_metrics)
+            record_timings(timings)
+            self._encode_queue.put((frame, points, frame_metrics))
+
+    def encode_loop(self):
+        while not self._stopped.is_set():
+            item = self._encode_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame, points, frame_metrics = item
+            timings = {}
+            payload = self.render(frame, points, frame_metrics, timings) if self.hub.viewers else None
+            record_timings(timings)
+            self.hub.publish(payload, frame_metrics, points)
+
+def create_worker(hub, camera_index, generation):
+    """Build the capture worker selected by PIPELINE_MODE"""
+    if config.PIPELINE_MODE == 'pipelined':
+        return PipelinedCaptureWorker(hub, camera_index, generation)
+    return CaptureWorker(hub, camera_index, generation)
+
+_hubs = {}
+_hubs_lock = threading.Lock()
+_metrics_listeners = []
+
+def add_metrics_listener(listener):
+    """Register listener(watchers, metrics, points), called from the worker for each frame with a
+    face with the keys of the sessions streaming that camera"""
+    _metrics_listeners.append(listener)
+
+def warm_up():
+    """Build the Face Mesh graphs and scoring model camera workers and uploads need before first use"""
+    start = time.perf_counter()
+    if config.INFERENCE_BACKEND == 'process':
+        # Inference runs in the pool, so start its workers instead of building graphs here
+        from inference_pool import get_inference_pool
+        get_inference_pool().warm_up()
+    else:
+        from ingest import image_face_meshes
+        face_meshes.warm_up(2 if config.INFERENCE_MODE == 'adaptive' else 1)
+        image_face_meshes.warm_up(1)
+    tesselation_edges()
+    if config.SCORING_MODE == 'model':
+        get_batcher()
+    metrics.gauge('warmup_seconds', 'Time spent warming up inference at startup').set(time.perf_counter() - start)
+
+def get_hub(camera_index=config.CAMERA_INDEX):
+    """Return the hub for a camera, starting its capture worker if needed"""
+    with _hubs_lock:
+        hub = _hubs.get(camera_index)
+        if hub is None:
+            hub = _hubs[camera_index] = FrameHub(camera_index)
+    hub.ensure_running(lambda generation: create_worker(hub, camera_index, generation).start())
+    return hub
@@ -1,108 +1,126 @@
-TECHNICAL_QUESTIONS = [
-    "Tell me about a challenging technical problem you've solved recently.",
-    "How do you handle tight deadlines and multiple competing priorities?",
-    "Describe your experience with version control systems like Git.",
-    "What's your approach to debugging complex issues?",
-    "How do you stay updated with the latest technology trends?",
-    "Tell me about a project you're most proud of and why.",
-    "How do you handle disagreements with team members about technical decisions?",
-    "What's your experience with agile development methodologies?",
-    "How do you ensure code quality in your projects?",
-    "Describe a situation where you had to learn a new technology quickly."
-]
-
-MEDICAL_QUESTIONS = [
-    "Tell me about a challenging patient case you've handled recently.",
-    "How do you manage stress in high-pressure medical situations?",
-    "Describe your experience with electronic health records systems.",
-    "How do you handle difficult conversations with patients or their families?",
-    "What's your approach to staying current with medical research and guidelines?",
-    "Tell me about a medical procedure you're most confident performing.",
-    "How do you handle disagreements with colleagues about treatment plans?",
-    "What's your experience with emergency situations?",
-    "How do you ensure patient safety in your practice?",
-    "Describe a situation where you had to make a quick medical decision."
-]
+"""Interview question catalog, loaded once from questions.json
+
+Each field has a numeric id (what sessions store), a slug (what the UI sends) and an
+ordered tuple of questions, so lookups by (field, index) never copy anything. Questions
+marked "extra" (the older per-field lists, some close to the main ones) are left out of
+the interview order but still reachable by tag and sampling. Tags index
+questions both per field and across the catalog, and sampling draws indices rather than
+shuffling lists, so the catalog can grow to tens of thousands of questions.
+"""
+import json
+import random
+import threading
+import config
+
+GENERAL_FIELD = 0
+# Unknown fields fall back to Technology, as the question lists always have
+DEFAULT_FIELD = 1
+
+class Field:
+    """One job field, its questions in interview order and its extra questions"""
+
+    def __init__(self, id, slug, name, questions, tags, listed=True, extras=()):
+        self.id = id
+        self.slug = slug
+        self.name = name
+        self.questions = questions
+        self.extras = extras
+        # Interview questions followed by the extras
+        self.pool = questions + extras
+        # tag -> tuple of indices into pool
+        self.tags = tags
+        self.listed = listed
+
+    def __len__(self):
+        return len(self.questions)
+
+class QuestionCatalog:
+    """Read-only question lookup by field id or slug, tag and index"""
+
+    def __init__(self, fields):
+        self._fields = tuple(fields)
+        self._by_id = {field.id: field for field in self._fields}
+        self._by_slug = {field.slug: field for field in self._fields}
+        tags = {}
+        for field in self._fields:
+            for tag, indices in field.tags.items():
+                tags.setdefault(tag, []).extend((field.id, index) for index in indices)
+        self._tags = {tag: tuple(refs) for tag, refs in tags.items()}
+
+    @classmethod
+    def load(cls, path=config.QUESTIONS_FILE):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        fields = []
+        for entry in data['fields']:
+            questions = [question for question in entry['questions'] if not question.get('extra')]
+            extras = [question for question in entry['questions'] if question.get('extra')]
+            tags = {}
+            for index, question in enumerate(questions + extras):
+                for tag in question.get('tags', ()):
+                    tags.setdefault(tag, []).append(index)
+            fields.append(Field(
+                entry['id'], entry['slug'], entry['name'],
+                tuple(question['text'] for question in questions),
+                {tag: tuple(indices) for tag, indices in tags.items()},
+                entry.get('listed', True),
+                tuple(question['text'] for question in extras)
+            ))
+        return cls(fields)
+
+    @property
+    def fields(self):
+        """Fields offered in the UI, in catalog order"""
+        return [field for field in self._fields if field.listed]
+
+    @property
+    def tags(self):
+        return sorted(self._tags)
+
+    def field(self, key=None):
+        """Resolve a field id, numeric string or slug; None is the general field"""
+        if key is None:
+            return self._by_id[GENERAL_FIELD]
+        if isinstance(key, str) and key.isdigit():
+            key = int(key)
+        field = self._by_id.get(key) if isinstance(key, int) else self._by_slug.get(key)
+        return field or self._by_id[DEFAULT_FIELD]
+
+    def question(self, key, index):
+        return self.field(key).questions[index]
+
+    def tagged(self, tag, key=None):
+        """Questions carrying tag, in catalog order, optionally within one field"""
+        if key is not None:
+            field = self.field(key)
+            return [field.pool[index] for index in field.tags.get(tag, ())]
+        return [self._by_id[field_id].pool[index] for field_id, index in self._tags.get(tag, ())]
+
+    def sample(self, key, count, seed=None, tag=None):
+        """count distinct questions from a field and its extras, reproducible for a given seed"""
+        field = self.field(key)
+        indices = field.tags.get(tag, ()) if tag is not None else range(len(field.pool))
+        picks = random.Random(seed).sample(range(len(indices)), min(count, len(indices)))
+        return [field.pool[indices[pick]] for pick in picks]
+
+    def all_questions(self):
+        """Every distinct question in the catalog"""
+        return list(dict.fromkeys(question for field in self._fields for question in field.pool))
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_catalog():
+    """The process-wide catalog, loaded on first use"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = QuestionCatalog.load()
+        return _catalog
 
 def get_questions(field_id=None):
     """
-    Returns a list of interview questions based on the selected field.
+    Returns the interview questions for the selected field.
     If no field_id is provided, returns general interview questions.
     """
-    if field_id is None:
-        return [
-            "Tell me about yourself and your background.",
-            "What are your greatest strengths and weaknesses?",
-            "Why are you interested in this position?",
-            "Where do you see yourself in 5 years?",
-            "Tell me about a challenging situation you faced and how you handled it.",
-            "What is your greatest achievement?",
-            "Why should we hire you?",
-            "What are your salary expectations?",
-            "Do you have any questions for us?",
-            "What motivates you in your work?"
-        ]
-    
-    questions = {
-        1: [  # Technology
-            "Tell me about your experience with modern programming languages and frameworks.",
-            "How do you stay updated with the latest technology trends?",
-            "Describe a challenging technical problem you've solved.",
-            "What's your approach to debugging complex issues?",
-            "How do you handle tight deadlines in software development?",
-            "Tell me about your experience with agile methodologies.",
-            "What's your preferred development environment and why?",
-            "How do you ensure code quality in your projects?",
-            "Describe your experience with version control systems.",
-            "What's your strategy for learning new technologies?"
-        ],
-        2: [  # Finance
-            "Walk me through your experience with financial modeling.",
-            "How do you stay current with market trends?",
-            "Describe your experience with risk assessment.",
-            "What financial software tools are you proficient in?",
-            "How do you handle high-pressure financial decisions?",
-            "Tell me about your experience with financial reporting.",
-            "What's your approach to portfolio management?",
-            "How do you ensure compliance in financial operations?",
-            "Describe your experience with financial forecasting.",
-            "What strategies do you use for financial analysis?"
-        ],
-        3: [  # Healthcare
-            "Tell me about your experience with patient care.",
-            "How do you handle stressful medical situations?",
-            "Describe your experience with healthcare regulations.",
-            "What medical software systems are you familiar with?",
-            "How do you maintain patient confidentiality?",
-            "Tell me about your experience with medical documentation.",
-            "What's your approach to patient communication?",
-            "How do you stay updated with medical advancements?",
-            "Describe your experience with healthcare protocols.",
-            "What strategies do you use for patient education?"
-        ],
-        4: [  # Marketing
-            "Walk me through your experience with digital marketing.",
-            "How do you measure campaign success?",
-            "Describe your experience with social media marketing.",
-            "What marketing tools and platforms do you use?",
-            "How do you develop marketing strategies?",
-            "Tell me about your experience with content creation.",
-            "What's your approach to brand management?",
-            "How do you handle market research?",
-            "Describe your experience with SEO.",
-            "What strategies do you use for audience engagement?"
-        ],
-        5: [  # Education
-            "Tell me about your teaching experience.",
-            "How do you handle classroom management?",
-            "Describe your experience with curriculum development.",
-            "What educational technologies do you use?",
-            "How do you assess student progress?",
-            "Tell me about your experience with special education.",
-            "What's your approach to student engagement?",
-            "How do you handle parent communication?",
-            "Describe your experience with educational programs.",
-            "What strategies do you use for differentiated instruction?"
-        ]
-    }
-    return questions.get(field_id, questions[1])  # Default to technology questions if field_id not found 
\ No newline at end of file
+    return get_catalog().field(field_id).questions
@@ -0,0 +1,263 @@
+"""Compact session recordings of landmarks and metrics, and their replay
+
+A recording is a 64-byte header followed by fixed-stride records, so it can be appended
+to while the interview runs and read back with numpy.memmap without loading it:
+
+    header  magic 'IRC1', version, header size, record size, landmark count,
+            frame width and height, landmark dtype ('e' float16 or 'f' float32), start time
+    record  time, kind (frame or question marker), flags, question index, confidence,
+            head/pupil codes and the (landmark count, 3) landmarks
+
+At 478 float16 landmarks a record is 2888 bytes, about 5 MB per minute at 30 FPS.
+
+Recordings are stored per session token under RECORDING_DIR, in a directory named by a
+hash of the token, so a returning session finds its recordings after the server restarts.
+A background thread runs prune_recordings every RECORDING_PRUNE_INTERVAL seconds to
+enforce RECORDING_MAX_AGE_DAYS and RECORDING_MAX_TOTAL_MB.
+"""
+import hashlib
+import os
+import struct
+import threading
+import time
+import numpy as np
+import config
+from confidence import ConfidenceHistory
+from face_analysis import annotate_frame, encode_frame
+from features import HEAD_POSITIONS, PUPIL_POSITIONS, REFINED_LANDMARK_COUNT, extract_features
+from overlay import FLAG_EYE_CONTACT, FLAG_FACE_FOUND
+from scoring import score_batch
+
+MAGIC = b'IRC1'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHHHHcxd')
+HEADER_SIZE = 64
+
+KIND_FRAME = 0
+KIND_QUESTION = 1
+
+def owner_dir(token):
+    """Directory of a session's recordings; named by a hash so tokens never reach the disk"""
+    return os.path.join(config.RECORDING_DIR, hashlib.sha256(token.encode()).hexdigest()[:32])
+
+def recording_path(token, recording_id):
+    return os.path.join(owner_dir(token), recording_id + '.irec')
+
+def recording_ids(token):
+    """Ids of a session's recordings, oldest first"""
+    try:
+        entries = [entry for entry in os.scandir(owner_dir(token)) if entry.name.endswith('.irec')]
+    except FileNotFoundError:
+        return []
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    return [entry.name[:-len('.irec')] for entry in entries]
+
+# Paths of recordings still being written, which pruning never deletes
+_open_paths = set()
+_pruner = None
+_pruner_lock = threading.Lock()
+
+def prune_recordings(max_age_days=config.RECORDING_MAX_AGE_DAYS, max_total_mb=config.RECORDING_MAX_TOTAL_MB):
+    """Delete recordings older than max_age_days, then the oldest ones until all of them
+    fit in max_total_mb; a limit of 0 is no limit and open recordings are never deleted"""
+    files = []
+    for root, _, names in os.walk(config.RECORDING_DIR):
+        for name in names:
+            if name.endswith('.irec'):
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+    files.sort()
+    total = sum(size for _, size, _ in files)
+    oldest_kept = time.time() - max_age_days * 86400
+    for mtime, size, path in files:
+        expired = max_age_days > 0 and mtime < oldest_kept
+        oversize = max_total_mb > 0 and total > max_total_mb * 1024 * 1024
+        if not (expired or oversize):
+            break
+        if path in _open_paths:
+            continue
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Error: Could not delete recording {path}: {e}")
+            continue
+        total -= size
+        try:
+            # Drop the owner's directory once it is empty
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+def _prune_periodically(interval):
+    while True:
+        try:
+            prune_recordings()
+        except Exception as e:
+            print(f"Error: Could not prune recordings: {e}")
+        time.sleep(interval)
+
+def start_pruning(interval=config.RECORDING_PRUNE_INTERVAL):
+    """Start the process-wide pruning thread unless it is already running"""
+    global _pruner
+    with _pruner_lock:
+        if _pruner is None:
+            _pruner = threading.Thread(target=_prune_periodically, args=(interval,),
+                                       name='recording-pruner', daemon=True)
+            _pruner.start()
+
+def record_dtype(landmark_dtype='e', landmark_count=REFINED_LANDMARK_COUNT):
+    return np.dtype([
+        ('time', '<f8'),
+        ('kind', 'u1'),
+        ('flags', 'u1'),
+        ('question', '<i2'),
+        ('confidence', '<f4'),
+        ('head_position', 'i1'),
+        ('left_pupil', 'i1'),
+        ('right_pupil', 'i1'),
+        ('reserved', 'u1'),
+        ('landmarks', '<' + landmark_dtype, (landmark_count, 3))
+    ])
+
+class RecordingWriter:
+    """Appends frames and question markers of one interview to a recording file"""
+
+    def __init__(self, path, landmark_dtype=config.RECORDING_LANDMARK_DTYPE,
+                 frame_size=(config.FRAME_WIDTH, config.FRAME_HEIGHT)):
+        self.path = path
+        self.dtype = record_dtype(landmark_dtype)
+        self._record = np.zeros(1, dtype=self.dtype)
+        self._question = 0
+        self.frames = 0
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._file = open(path, 'wb')
+        _open_paths.add(path)
+        header = HEADER.pack(MAGIC, VERSION, HEADER_SIZE, self.dtype.itemsize, REFINED_LANDMARK_COUNT,
+                             frame_size[0], frame_size[1], landmark_dtype.encode(), time.time())
+        self._file.write(header.ljust(HEADER_SIZE, b'\0'))
+
+    def write_frame(self, timestamp, points, metrics):
+        if points is None or len(points) != REFINED_LANDMARK_COUNT:
+            return
+        record = self._record[0]
+        record['time'] = timestamp
+        record['kind'] = KIND_FRAME
+        record['flags'] = FLAG_FACE_FOUND | (FLAG_EYE_CONTACT if metrics['is_eye_contact'] else 0)
+        record['question'] = self._question
+        record['confidence'] = metrics['confidence']
+        record['head_position'] = HEAD_POSITIONS.index(metrics['head_position'])
+        record['left_pupil'] = PUPIL_POSITIONS.index(metrics['left_pupil'])
+        record['right_pupil'] = PUPIL_POSITIONS.index(metrics['right_pupil'])
+        record['landmarks'] = points
+        self._file.write(self._record.tobytes())
+        self.frames += 1
+
+    def mark_question(self, timestamp, index):
+        """Attribute subsequent frames to question index"""
+        self._question = index
+        marker = np.zeros(1, dtype=self.dtype)
+        marker['time'] = timestamp
+        marker['kind'] = KIND_QUESTION
+        marker['question'] = index
+        self._file.write(marker.tobytes())
+        # Make everything so far visible to readers of an ongoing recording
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+        _open_paths.discard(self.path)
+
+class Recording:
+    """Read-only view of a recording file backed by numpy.memmap"""
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            (magic, version, header_size, record_size, landmark_count,
+             self.width, self.height, landmark_dtype, self.start_time) = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a version {VERSION} recording')
+        self.dtype = record_dtype(landmark_dtype.decode(), landmark_count)
+        if self.dtype.itemsize != record_size:
+            raise ValueError(f'{path} has an unexpected record size')
+        # A partially written trailing record is ignored
+        count = (os.path.getsize(path) - header_size) // record_size
+        self.records = np.memmap(path, dtype=self.dtype, mode='r', offset=header_size, shape=(count,)) \
+            if count else np.zeros(0, dtype=self.dtype)
+
+    def __len__(self):
+        return len(self.records)
+
+    def chunks(self, chunk_records=config.RECORDING_CHUNK_RECORDS):
+        """Consecutive slices of the records; each is paged in only when read"""
+        for start in range(0, len(self.records), chunk_records):
+            yield self.records[start:start + chunk_records]
+
+    def summary(self):
+        records = self.records
+        frames = int(np.count_nonzero(records['kind'] == KIND_FRAME))
+        return {
+            'frames': frames,
+            'questions': int(len(records) - frames),
+            'started': self.start_time,
+            'duration': float(records['time'][-1] - records['time'][0]) if len(records) else 0.0
+        }
+
+def rescore(recording, use_model=None):
+    """Score a recording's landmarks again with the current rules or model
+
+    Returns per-question and overall confidence summaries, computed chunk by chunk.
+    """
+    use_model = config.SCORING_MODE == 'model' if use_model is None else use_model
+    history = ConfidenceHistory()
+    for chunk in recording.chunks():
+        frames = chunk['kind'] == KIND_FRAME
+        features = extract_features(chunk['landmarks'][frames].astype(np.float32), jitter=0)
+        is_eye_contact = features['is_eye_contact']
+        if use_model and frames.any():
+            model_decisions = score_batch(features)
+            if model_decisions is not None:
+                is_eye_contact = model_decisions
+        scored = iter(zip(chunk['time'][frames].tolist(), features['confidence'].tolist(), is_eye_contact.tolist()))
+        for kind, question in zip(chunk['kind'].tolist(), chunk['question'].tolist()):
+            if kind == KIND_QUESTION:
+                history.start_question(question)
+            else:
+                history.add(*next(scored))
+    return {
+        'questions': {index: stats.summary() for index, stats in sorted(history.questions.items()) if stats.count},
+        'overall': history.overall.summary()
+    }
+
+def stored_metrics(record):
+    """The metrics dict that was recorded with one frame record"""
+    return {
+        'is_eye_contact': bool(record['flags'] & FLAG_EYE_CONTACT),
+        'confidence': float(record['confidence']),
+        'head_position': HEAD_POSITIONS[record['head_position']],
+        'left_pupil': PUPIL_POSITIONS[record['left_pupil']],
+        'right_pupil': PUPIL_POSITIONS[record['right_pupil']]
+    }
+
+def render_overlay(recording, realtime=True):
+    """Yield JPEG frames of the recorded mesh and metrics drawn on a blank canvas"""
+    canvas = np.zeros((recording.height, recording.width, 3), dtype=np.uint8)
+    started = None
+    for chunk in recording.chunks():
+        for record in chunk[chunk['kind'] == KIND_FRAME]:
+            if realtime:
+                # Pace playback by the recorded timestamps
+                if started is None:
+                    started = (time.monotonic(), record['time'])
+                delay = (record['time'] - started[1]) - (time.monotonic() - started[0])
+                if delay > 0:
+                    time.sleep(delay)
+            canvas[:] = 0
+            annotate_frame(canvas, record['landmarks'].astype(np.float32), stored_metrics(record))
+            jpeg = encode_frame(canvas)
+            if jpeg is not None:
+                yield jpeg
@@ -0,0 +1,145 @@
+"""Model-backed eye contact scoring with the bundled eye_contact_model.joblib
+
+The classifier is loaded lazily, once per process. Live frames from every camera worker
+are funnelled through one MicroBatcher, which groups them into batches of up to
+SCORING_BATCH_SIZE frames or SCORING_BATCH_WAIT_MS and runs a single predict_proba per
+batch. If the model cannot be loaded or a prediction does not arrive in time, callers
+keep the rule-based result from features.extract_features.
+"""
+import queue
+import threading
+import time
+import numpy as np
+import config
+import metrics
+
+# Feature vector layout the classifier was trained on
+MODEL_FEATURES = ('left_ear', 'right_ear', 'nose_dx', 'nose_dy', 'ear_diff')
+
+BATCH_SIZES = metrics.histogram('scoring_batch_size', 'Frames scored per predict_proba call',
+                                buckets=(1, 2, 4, 8, 16, 32, 64, 128))
+PREDICT_SECONDS = metrics.histogram('scoring_predict_seconds', 'Duration of one batched predict_proba call')
+FALLBACKS = metrics.counter('scoring_fallback_total', 'Frames scored by the rules because the model was unavailable')
+
+def feature_vectors(features):
+    """Model inputs from an extract_features dict; (..., 5) float32"""
+    return np.stack([
+        features['left_ear'],
+        features['right_ear'],
+        features['nose_direction'][..., 0],
+        features['nose_direction'][..., 1],
+        np.abs(features['left_ear'] - features['right_ear'])
+    ], axis=-1).astype(np.float32)
+
+_model = None
+_model_loaded = False
+_model_lock = threading.Lock()
+
+def load_model(path=config.SCORING_MODEL_PATH):
+    """The classifier, loaded on first use; None if it cannot be loaded"""
+    global _model, _model_loaded
+    with _model_lock:
+        if not _model_loaded:
+            _model_loaded = True
+            try:
+                import joblib
+                _model = joblib.load(path)
+            except Exception as e:
+                print(f"Error: Could not load scoring model {path}: {e}")
+        return _model
+
+def eye_contact_probability(model, vectors):
+    """P(eye contact) for an (F, 5) batch of feature vectors"""
+    start = time.perf_counter()
+    probabilities = model.predict_proba(vectors)
+    PREDICT_SECONDS.observe(time.perf_counter() - start)
+    BATCH_SIZES.observe(len(vectors))
+    return probabilities[:, list(model.classes_).index(1)]
+
+class PendingScore:
+    """Result slot for one submitted frame"""
+
+    def __init__(self, vector):
+        self.vector = vector
+        self.probability = None
+        self._done = threading.Event()
+
+    def set(self, probability):
+        self.probability = probability
+        self._done.set()
+
+    def wait(self, timeout):
+        """Probability of eye contact, or None if it was not ready within timeout"""
+        self._done.wait(timeout)
+        return self.probability
+
+class MicroBatcher(threading.Thread):
+    """Scores frames submitted from any thread in shared predict_proba batches"""
+
+    def __init__(self, model, max_batch=config.SCORING_BATCH_SIZE, max_wait=config.SCORING_BATCH_WAIT_MS / 1000):
+        super().__init__(name='scoring', daemon=True)
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = queue.SimpleQueue()
+
+    def submit(self, vector):
+        pending = PendingScore(vector)
+        self._pending.put(pending)
+        return pending
+
+    def run(self):
+        while True:
+            # Block for the first frame, then gather more until the batch fills or time runs out
+            batch = [self._pending.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._pending.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                probabilities = eye_contact_probability(self.model, np.stack([p.vector for p in batch]))
+            except Exception as e:
+                print(f"Error: Scoring batch failed: {e}")
+                probabilities = [None] * len(batch)
+            for pending, probability in zip(batch, probabilities):
+                pending.set(probability)
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+def get_batcher():
+    """The process-wide micro-batcher, started on first use; None without a model"""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            model = load_model()
+            if model is None:
+                return None
+            _batcher = MicroBatcher(model)
+            _batcher.start()
+        return _batcher
+
+def apply_model(features, metrics):
+    """Replace the rule-based eye contact decision of one frame with the model's"""
+    batcher = get_batcher()
+    probability = None
+    if batcher is not None:
+        probability = batcher.submit(feature_vectors(features)).wait(config.SCORING_TIMEOUT_MS / 1000)
+    if probability is None:
+        FALLBACKS.inc()
+        return metrics
+    metrics['is_eye_contact'] = bool(probability >= config.SCORING_THRESHOLD)
+    metrics['eye_contact_probability'] = float(probability)
+    return metrics
+
+def score_batch(features):
+    """Model eye contact decisions for a whole extract_features batch, or None without a model"""
+    model = load_model()
+    if model is None:
+        return None
+    return eye_contact_probability(model, feature_vectors(features)) >= config.SCORING_THRESHOLD
@@ -0,0 +1,154 @@
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import config
+from confidence import ConfidenceHistory
+from ingest import FrameGate
+from inference_pool import release_session
+from recording import RecordingWriter, recording_ids, recording_path, start_pruning
+
+class InterviewSession:
+    """Interview progress and live metrics of one candidate"""
+
+    def __init__(self, token, camera_index=config.CAMERA_INDEX):
+        self.token = token
+        self.camera_index = camera_index
+        self.lock = threading.Lock()
+        self.last_seen = time.monotonic()
+
+        # Interview progress
+        self.interview_started = False
+        self.field_id = 1
+        self.current_question = None
+        self.current_question_index = 0
+        self.confidence = ConfidenceHistory()
+        self.is_speaking = False
+        # Writer of the running interview's recording
+        self.recorder = None
+
+        # Sessions that upload their own frames stop receiving the server camera's metrics
+        self.uploads_frames = False
+        self.ingest_gate = FrameGate()
+
+        # Latest metrics from the frame pipeline; status_version counts updates and
+        # status_changed wakes every status stream subscribed to this session
+        self.current_eye_contact = False
+        self.current_confidence = 0.0
+        self.status_version = 0
+        self.status_changed = threading.Condition(self.lock)
+
+    def update_metrics(self, metrics, points=None):
+        """Store the metrics of the latest analyzed frame"""
+        with self.lock:
+            self.current_eye_contact = metrics['is_eye_contact']
+            self.current_confidence = metrics['confidence']
+            if self.interview_started:
+                self.confidence.add(time.monotonic(), metrics['confidence'], metrics['is_eye_contact'])
+            if self.recorder is not None:
+                self.recorder.write_frame(time.time(), points, metrics)
+            self.status_version += 1
+            self.status_changed.notify_all()
+
+    def start_recording(self):
+        """Record the interview that is starting; call with the lock held"""
+        self.stop_recording()
+        if not config.RECORDING_ENABLED:
+            return
+        self.recorder = RecordingWriter(recording_path(self.token, secrets.token_hex(8)))
+        start_pruning()
+
+    def mark_question(self, index):
+        """Question change marker in the running recording; call with the lock held"""
+        if self.recorder is not None:
+            self.recorder.mark_question(time.time(), index)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def wait_for_status(self, last_version, timeout):
+        """Block until the metrics change after last_version; returns (version, status)"""
+        with self.lock:
+            self.status_changed.wait_for(lambda: self.status_version != last_version, timeout)
+            return self.status_version, {
+                'is_eye_contact': self.current_eye_contact,
+                'confidence': round(self.current_confidence, 1)
+            }
+
+class SessionRegistry:
+    """Thread-safe token -> InterviewSession map with idle eviction and a size cap"""
+
+    def __init__(self, max_sessions=config.MAX_SESSIONS, idle_timeout=config.SESSION_IDLE_TIMEOUT):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        # Ordered from least to most recently used
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def get(self, token):
+        """Return the live session for a token, or None if it is unknown or expired"""
+        if not token:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is None:
+                return None
+            if now - session.last_seen > self.idle_timeout:
+                del self._sessions[token]
+                self._close(session)
+                return None
+            session.last_seen = now
+            self._sessions.move_to_end(token)
+            return session
+
+    def create(self, token=None):
+        """Create a session under token or a fresh one, evicting idle or least recently used ones"""
+        session = InterviewSession(token or secrets.token_urlsafe(24))
+        with self._lock:
+            if session.token in self._sessions:
+                return self._sessions[session.token]
+            self._evict_idle(session.last_seen)
+            while len(self._sessions) >= self.max_sessions:
+                self._close(self._sessions.popitem(last=False)[1])
+            self._sessions[session.token] = session
+        return session
+
+    def get_or_create(self, token):
+        """The live session for token; an expired token that owns recordings is revived so
+        they stay reachable, any other unknown token gets a fresh session"""
+        session = self.get(token)
+        if session is None:
+            session = self.create(token if token and recording_ids(token) else None)
+        return session
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict_idle(time.monotonic())
+
+    def _evict_idle(self, now):
+        while self._sessions:
+            token, session = next(iter(self._sessions.items()))
+            if now - session.last_seen <= self.idle_timeout:
+                break
+            del self._sessions[token]
+            self._close(session)
+
+    @staticmethod
+    def _close(session):
+        with session.lock:
+            session.stop_recording()
+        release_session(session.token)
+
+    def publish_metrics(self, tokens, metrics, points=None):
+        """Frame pipeline hook: fan a camera's metrics out to the sessions streaming it"""
+        with self._lock:
+            watching = [s for s in map(self._sessions.get, tokens) if s is not None and not s.uploads_frames]
+        for session in watching:
+            session.update_metrics(metrics, points)
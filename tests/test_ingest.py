@@ -0,0 +1,54 @@
+import os
+import sys
+import unittest
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from ingest import FrameGate, image_size
+
+class FrameGateTest(unittest.TestCase):
+
+    def pass_frames(self, gate, seqs, stream=None):
+        for seq in seqs:
+            self.assertTrue(gate.enter(seq, stream), f'frame {seq} was dropped')
+            gate.leave()
+
+    def test_stale_frame_is_dropped(self):
+        gate = FrameGate()
+        self.pass_frames(gate, [1, 2, 3])
+        self.assertFalse(gate.enter(2))
+
+    def test_restarted_numbering_is_a_new_stream(self):
+        gate = FrameGate()
+        self.pass_frames(gate, range(1, config.INGEST_SEQ_RESET + 10))
+        # The page was reloaded with the same session cookie
+        self.pass_frames(gate, [1, 2, 3])
+
+    def test_new_stream_id_resets_numbering(self):
+        gate = FrameGate()
+        self.pass_frames(gate, [1, 2, 3], stream='a')
+        self.pass_frames(gate, [1, 2], stream='b')
+        self.assertFalse(gate.enter(1, 'b'))
+
+    def test_late_frame_of_identified_stream_is_dropped(self):
+        gate = FrameGate()
+        self.pass_frames(gate, range(1, config.INGEST_SEQ_RESET + 10), stream='a')
+        self.assertFalse(gate.enter(1, 'a'))
+
+class ImageSizeTest(unittest.TestCase):
+
+    def test_size_is_read_from_the_header(self):
+        frame = np.zeros((120, 200, 3), dtype=np.uint8)
+        for ext in ('.jpg', '.png'):
+            data = cv2.imencode(ext, frame)[1].tobytes()
+            self.assertEqual(image_size(data), (200, 120), ext)
+
+    def test_non_image_has_no_size(self):
+        self.assertIsNone(image_size(b'not an image'))
+        self.assertIsNone(image_size(b'\xff\xd8\xff'))
+
+if __name__ == '__main__':
+    unittest.main()
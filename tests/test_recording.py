@@ -0,0 +1,75 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from benchmark import synthetic_landmarks
+from face_analysis import score_points
+from recording import KIND_FRAME, KIND_QUESTION, Recording, RecordingWriter, rescore
+
+class RecordingRoundTripTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'session', 'interview.irec')
+        self.landmarks = synthetic_landmarks(length=5, seed=1)
+        self.metrics = [score_points(points) for points in self.landmarks]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, landmark_dtype='e'):
+        """Question 0 with three frames, then question 1 with two"""
+        writer = RecordingWriter(self.path, landmark_dtype, frame_size=(320, 240))
+        writer.mark_question(100.0, 0)
+        for i in range(5):
+            if i == 3:
+                writer.mark_question(103.0, 1)
+            writer.write_frame(100.5 + i, self.landmarks[i], self.metrics[i])
+        # Frames without a face are not recorded
+        writer.write_frame(106.0, None, None)
+        writer.close()
+
+    def test_records_round_trip(self):
+        for landmark_dtype, tolerance in (('e', 1e-3), ('f', 0)):
+            with self.subTest(landmark_dtype=landmark_dtype):
+                self.write(landmark_dtype)
+                recording = Recording(self.path)
+                self.assertEqual((recording.width, recording.height), (320, 240))
+                self.assertEqual(len(recording), 7)
+                self.assertEqual(recording.records['kind'].tolist(),
+                                 [KIND_QUESTION] + [KIND_FRAME] * 3 + [KIND_QUESTION] + [KIND_FRAME] * 2)
+                frames = recording.records[recording.records['kind'] == KIND_FRAME]
+                self.assertEqual(frames['question'].tolist(), [0, 0, 0, 1, 1])
+                np.testing.assert_allclose(frames['time'], [100.5 + i for i in range(5)])
+                np.testing.assert_allclose(frames['confidence'], [m['confidence'] for m in self.metrics], rtol=1e-6)
+                np.testing.assert_allclose(frames['landmarks'].astype(np.float32), np.stack(self.landmarks),
+                                           atol=tolerance)
+                self.assertEqual(recording.summary()['frames'], 5)
+                self.assertEqual(recording.summary()['questions'], 2)
+
+    def test_partial_trailing_record_is_ignored(self):
+        self.write()
+        with open(self.path, 'ab') as f:
+            f.write(b'\0' * 100)
+        self.assertEqual(len(Recording(self.path)), 7)
+
+    def test_other_files_are_rejected(self):
+        with open(self.path.replace('session', ''), 'wb') as f:
+            f.write(b'\0' * 128)
+        with self.assertRaises(ValueError):
+            Recording(f.name)
+
+    def test_rescore_attributes_frames_to_questions(self):
+        self.write()
+        scores = rescore(Recording(self.path), use_model=False)
+        self.assertEqual(sorted(scores['questions']), [0, 1])
+        self.assertEqual(scores['questions'][0]['frames'], 3)
+        self.assertEqual(scores['questions'][1]['frames'], 2)
+        self.assertEqual(scores['overall']['frames'], 5)
+
+if __name__ == '__main__':
+    unittest.main()
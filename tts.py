@@ -0,0 +1,165 @@
+import hashlib
+import itertools
+import os
+import queue
+import threading
+import config
+import metrics
+
+# Job priorities: anything a candidate is waiting for runs before cache pre-warming
+PRIORITY_NOW = 0
+PRIORITY_PREWARM = 1
+
+class SpeechWorker(threading.Thread):
+    """Owns the process's only pyttsx3 engine and runs every speech job from one queue
+
+    Besides speaking on the server, the worker renders questions to WAV files in
+    TTS_CACHE_DIR, keyed by text, voice and rate, so repeated and shared questions are
+    synthesized once and can be served to the browser straight from disk.
+    """
+
+    def __init__(self, cache_dir=config.TTS_CACHE_DIR, rate=config.TTS_RATE):
+        super().__init__(name='tts', daemon=True)
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.rate = rate
+        self.voice = None
+        self._jobs = queue.PriorityQueue()
+        self._order = itertools.count()
+        # Set once the engine has started or failed to; available says which
+        self._ready = threading.Event()
+        self.available = False
+        self._lock = threading.Lock()
+        # Cache keys being synthesized -> Event set once the file exists
+        self._rendering = {}
+        # (session token, text) pairs queued to be spoken
+        self._pending_speech = set()
+        # Cache key -> text handed out for synthesis on demand
+        self._on_demand = {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @property
+    def pending(self):
+        return self._jobs.qsize()
+
+    def wait_until_ready(self, timeout=config.TTS_START_TIMEOUT):
+        """True once the engine is running; False if it failed or is still starting after timeout"""
+        return self._ready.wait(timeout) and self.available
+
+    def cache_key(self, text):
+        """Cache key for text in the engine's voice at the configured rate; None without an engine"""
+        if not self.wait_until_ready():
+            return None
+        return hashlib.sha1(f'{self.voice}\0{self.rate}\0{text}'.encode()).hexdigest()
+
+    def cache_path(self, key):
+        return os.path.join(self.cache_dir, key + '.wav')
+
+    def speak(self, interview, text):
+        """Queue text to be spoken on the server; a repeat still waiting in the queue is dropped"""
+        if not self.wait_until_ready():
+            return
+        with self._lock:
+            if (interview.token, text) in self._pending_speech:
+                return
+            self._pending_speech.add((interview.token, text))
+        self._put(PRIORITY_NOW, ('speak', text, interview))
+
+    def synthesize(self, text, priority=PRIORITY_NOW, on_demand=False):
+        """Make sure text is cached as audio; returns its cache key without waiting, or None
+        if there is no engine to synthesize it. With on_demand, the audio is only rendered
+        once wait_for_audio asks for it."""
+        key = self.cache_key(text)
+        if key is None:
+            return None
+        with self._lock:
+            if key in self._rendering or os.path.exists(self.cache_path(key)):
+                return key
+            if on_demand:
+                self._on_demand[key] = text
+                return key
+            self._rendering[key] = threading.Event()
+        self._put(priority, ('synthesize', text, key))
+        return key
+
+    def prewarm(self, texts):
+        """Queue every text for synthesis behind interactive jobs"""
+        for text in dict.fromkeys(texts):
+            if self.synthesize(text, PRIORITY_PREWARM) is None:
+                return
+
+    def wait_for_audio(self, key, timeout):
+        """Path of the cached audio for key, waiting for an in-flight or on-demand synthesis;
+        None if unavailable"""
+        path = self.cache_path(key)
+        with self._lock:
+            text = self._on_demand.pop(key, None)
+        if text is not None:
+            self.synthesize(text)
+        with self._lock:
+            rendering = self._rendering.get(key)
+        if rendering is not None:
+            rendering.wait(timeout)
+        return path if os.path.exists(path) else None
+
+    def _put(self, priority, job):
+        self._jobs.put((priority, next(self._order), job))
+
+    def run(self):
+        try:
+            import pyttsx3
+            engine = pyttsx3.init()
+            engine.setProperty('rate', self.rate)
+            self.voice = engine.getProperty('voice')
+            self.available = True
+        except Exception as e:
+            print(f"Error: Could not start text-to-speech engine: {e}")
+            return
+        finally:
+            # Release callers waiting in cache_key whether or not the engine started
+            self._ready.set()
+        while True:
+            _, _, job = self._jobs.get()
+            try:
+                if job[0] == 'speak':
+                    self._speak(engine, *job[1:])
+                else:
+                    self._synthesize(engine, *job[1:])
+            except Exception as e:
+                print(f"Error: Text-to-speech failed: {e}")
+
+    def _speak(self, engine, text, interview):
+        with self._lock:
+            self._pending_speech.discard((interview.token, text))
+        interview.is_speaking = True
+        try:
+            engine.say(text)
+            engine.runAndWait()
+        finally:
+            interview.is_speaking = False
+
+    def _synthesize(self, engine, text, key):
+        path = self.cache_path(key)
+        try:
+            if not os.path.exists(path):
+                # Render to a temporary name so readers never see a partial file
+                partial = path + '.part'
+                engine.save_to_file(text, partial)
+                engine.runAndWait()
+                os.replace(partial, path)
+        finally:
+            with self._lock:
+                self._rendering.pop(key).set()
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_speech_worker():
+    """The process-wide speech worker, started on first use"""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SpeechWorker()
+            _worker.start()
+            metrics.gauge('tts_queue_depth', 'Speech and synthesis jobs waiting in the TTS queue',
+                          callback=lambda: _worker.pending)
+        return _worker